@@ -0,0 +1,55 @@
+import hashlib
+import os
+import shutil
+import threading
+
+try:
+    from PIL import Image
+except ImportError:  # assets are served at their original size
+    Image = None
+
+# ---------------- CONFIG ----------------
+# Fixed images (the banner, ...) are prepared once per process into
+# ASSET_ROOT under a content-hashed name, then served by the media server
+# with an immutable Cache-Control: browsers fetch each version once and
+# reruns send only the URL.
+ASSET_ROOT = os.environ.get("SKILLSYNC_ASSETS", "static_cache")
+PIXEL_DENSITY = 2   # resized for high-DPI screens: width 500 keeps 1000px
+
+_built = {}
+_lock = threading.Lock()
+
+def _digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+def _build(path, width):
+    name, ext = os.path.splitext(os.path.basename(path))
+    target = os.path.join(ASSET_ROOT, f"{name}-{_digest(path)}-{width or 'orig'}{ext}")
+    if os.path.exists(target):
+        return target
+    os.makedirs(ASSET_ROOT, exist_ok=True)
+    tmp = target + ".tmp"
+    with open(path, "rb") as f:
+        image = Image.open(f) if Image is not None and width else None
+        if image is not None and image.width > width * PIXEL_DENSITY:
+            size = (width * PIXEL_DENSITY, round(image.height * width * PIXEL_DENSITY / image.width))
+            image.resize(size, Image.LANCZOS).save(tmp, image.format, optimize=True, quality=85)
+        else:
+            f.seek(0)
+            with open(tmp, "wb") as out:
+                shutil.copyfileobj(f, out)
+    os.replace(tmp, target)
+    return target
+
+def asset_path(path, width=None):
+    # Served file for a static asset; rebuilt when the source changes
+    stat = os.stat(path)
+    key = (path, width, stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        if key not in _built:
+            _built[key] = _build(path, width)
+        return _built[key]
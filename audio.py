@@ -0,0 +1,45 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+import blobstore
+import cache
+import db
+
+# ---------------- CONFIG ----------------
+# WAV uploads are re-encoded to MP3 in the background so listeners stream a
+# fraction of the bytes. Needs ffmpeg on PATH; without it podcasts are
+# served as uploaded.
+FFMPEG = shutil.which("ffmpeg")
+MP3_BITRATE = "128k"
+TRANSCODE_TYPES = {".wav"}
+
+def transcode_podcast(podcast_id):
+    podcast = db.fetchone("SELECT id, file_path, blob_sha, file_name FROM podcasts WHERE id=?", (podcast_id,))
+    if podcast is None:
+        return "podcast deleted"
+    base, ext = os.path.splitext(podcast["file_name"] or podcast["file_path"])
+    if ext.lower() not in TRANSCODE_TYPES:
+        return "already compressed"
+    if FFMPEG is None:
+        return "skipped: ffmpeg not installed"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "podcast.mp3")
+        subprocess.run([FFMPEG, "-nostdin", "-loglevel", "error", "-i", podcast["file_path"],
+                        "-vn", "-codec:a", "libmp3lame", "-b:a", MP3_BITRATE, out],
+                       check=True, capture_output=True, timeout=30 * 60)
+        with open(out, "rb") as f:
+            staged = blobstore.stage(f)
+
+    with db.write() as conn:
+        # Only swap if the podcast still points at the file we transcoded
+        current = conn.execute("SELECT blob_sha FROM podcasts WHERE id=?", (podcast_id,)).fetchone()
+        if current is None or current[0] != podcast["blob_sha"]:
+            blobstore.discard(staged)
+            return "podcast changed while transcoding"
+        conn.execute("UPDATE podcasts SET file_path=?, blob_sha=?, file_name=? WHERE id=?",
+                     (blobstore.commit(conn, staged), staged[1], base + ".mp3", podcast_id))
+    db.on_commit(cache.invalidate, "podcasts")
+    return f"transcoded to {staged[2]} bytes"
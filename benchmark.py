@@ -0,0 +1,283 @@
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import blobstore
+import cache
+import db
+import helpers
+import migrations
+import passwords
+import ratings
+import search
+
+# ---------------- CONFIG ----------------
+# Builds a synthetic campus in a scratch directory (its own database and
+# blob store), then times the helpers cold and cached, full section renders
+# through Streamlit's AppTest, and concurrent sessions. Results can be
+# saved as a JSON baseline and later runs compared against it.
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample7.py")
+SCALES = {
+    "small": {"users": 1000, "posts": 5000, "courses": 500, "questions": 2000, "notes": 500,
+              "likes": 5000, "projects": 200, "members": 2000, "hackathons": 50, "participants": 1000},
+    "medium": {"users": 20000, "posts": 100000, "courses": 5000, "questions": 20000, "notes": 5000,
+               "likes": 100000, "projects": 2000, "members": 40000, "hackathons": 500, "participants": 20000},
+    "large": {"users": 100000, "posts": 1000000, "courses": 20000, "questions": 100000, "notes": 20000,
+              "likes": 1000000, "projects": 10000, "members": 200000, "hackathons": 2000, "participants": 100000},
+}
+SECTIONS = ["Profile", "Posts", "Courses", "Notes", "Forum", "Podcasts", "Projects", "Hackathons", "Leaderboard"]
+WORDS = ("python java sql streamlit machine learning data structures algorithms calculus physics "
+         "hackathon project notes exam lab assignment cloud web design robotics").split()
+BATCH = 5000
+
+def text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+# ---------------- DATA ----------------
+def insert_batched(conn, sql, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            conn.executemany(sql, batch)
+            batch = []
+    conn.executemany(sql, batch)
+
+def generate(scale, seed=0):
+    rng = random.Random(seed)
+    users = [f"user{i}" for i in range(scale["users"])]
+    # One hash shared by every user: login_user then costs what a real login does
+    password = passwords.hash_password("password")
+    with db.write() as conn:
+        insert_batched(conn, "INSERT INTO users (username, password, college, skills, bio, profile_pic) VALUES (?, ?, ?, ?, ?, '')",
+                       ((u, password, f"College {rng.randrange(50)}", ", ".join(rng.sample(WORDS, 3)), text(rng, 8))
+                        for u in users))
+        insert_batched(conn, "INSERT INTO posts (username, content) VALUES (?, ?)",
+                       ((rng.choice(users), text(rng, 20)) for _ in range(scale["posts"])))
+        insert_batched(conn, "INSERT INTO courses (username, course_name, description) VALUES (?, ?, ?)",
+                       ((rng.choice(users), text(rng, 3), text(rng, 25)) for _ in range(scale["courses"])))
+        insert_batched(conn, "INSERT INTO forum (username, question, answer) VALUES (?, ?, ?)",
+                       ((rng.choice(users), text(rng, 10) + "?", text(rng, 15) if rng.random() < 0.5 else "")
+                        for _ in range(scale["questions"])))
+    # Notes get real files in the blob store, one transaction per batch
+    for start in range(0, scale["notes"], 500):
+        with db.write():
+            for i in range(start, min(start + 500, scale["notes"])):
+                body = "\n".join(text(rng, 12) for _ in range(rng.randrange(20, 200))).encode()
+                helpers.add_notes(rng.choice(users), text(rng, 4), blobstore.stage(io.BytesIO(body)), f"note{i}.txt")
+    with db.write() as conn:
+        note_ids = [row[0] for row in conn.execute("SELECT id FROM notes")]
+        insert_batched(conn, "INSERT OR IGNORE INTO note_likes (note_id, username) VALUES (?, ?)",
+                       ((rng.choice(note_ids), rng.choice(users)) for _ in range(scale["likes"])))
+        for table, members, count, key in [("projects", "project_members", "members", "project_id"),
+                                           ("hackathons", "hackathon_participants", "participants", "hackathon_id")]:
+            if table == "projects":
+                insert_batched(conn, "INSERT INTO projects (title, description, owner, members) VALUES (?, ?, ?, '')",
+                               ((text(rng, 3), text(rng, 20), rng.choice(users)) for _ in range(scale["projects"])))
+            else:
+                insert_batched(conn, "INSERT INTO hackathons (title, description, start_date, end_date, participants) "
+                                     "VALUES (?, ?, '2025-01-01', '2025-01-02', '')",
+                               ((text(rng, 3), text(rng, 20)) for _ in range(scale["hackathons"])))
+            ids = [row[0] for row in conn.execute(f"SELECT id FROM {table}")]
+            insert_batched(conn, f"INSERT OR IGNORE INTO {members} ({key}, username) VALUES (?, ?)",
+                           ((rng.choice(ids), rng.choice(users)) for _ in range(scale[count])))
+    cache.clear()
+    return users
+
+# ---------------- MEASUREMENT ----------------
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+def summarize(samples, elapsed=None):
+    return {"n": len(samples),
+            "mean_ms": 1000 * sum(samples) / len(samples),
+            "p50_ms": 1000 * percentile(samples, 50),
+            "p95_ms": 1000 * percentile(samples, 95),
+            "p99_ms": 1000 * percentile(samples, 99),
+            "ops_per_s": len(samples) / (elapsed if elapsed else sum(samples))}
+
+def measure(fn, iterations, cold=True):
+    samples = []
+    for _ in range(iterations):
+        if cold:
+            cache.clear()
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+def helper_cases(users, rng):
+    oldest = db.fetchone("SELECT MIN(id) FROM posts")[0] or 0
+    note_ids = [n[0] for n in helpers.get_notes()]
+    project_ids = [p[0] for p in helpers.get_projects()]
+    questions = [q[0] for q in db.fetchall("SELECT id FROM forum WHERE answer = '' LIMIT 10000")]
+    counter = iter(range(10**9))
+    return {
+        "get_user": lambda: helpers.get_user(rng.choice(users)),
+        "login_user": lambda: helpers.login_user(rng.choice(users), "password"),
+        "get_posts": lambda: helpers.get_posts(),
+        "get_posts[deep page]": lambda: helpers.get_posts(before_id=oldest + 50),
+        "get_courses": lambda: helpers.get_courses(),
+        "get_questions": lambda: helpers.get_questions(),
+        "get_notes": lambda: helpers.get_notes(),
+        "get_note_meta": lambda: helpers.get_note_meta(note_ids),
+        "get_liked_notes": lambda: helpers.get_liked_notes(rng.choice(users), note_ids),
+        "get_podcasts": lambda: helpers.get_podcasts(),
+        "get_projects": lambda: helpers.get_project_members([p[0] for p in helpers.get_projects()]),
+        "get_hackathons": lambda: helpers.get_hackathon_participants([h[0] for h in helpers.get_hackathons()]),
+        "get_my_projects": lambda: helpers.get_my_projects(rng.choice(users)),
+        "get_leaderboard": lambda: helpers.get_leaderboard(),
+        "get_rank": lambda: helpers.get_rank(rng.choice(users)),
+        "search": lambda: search.search(rng.choice(WORDS)),
+        "add_post": lambda: helpers.add_post(rng.choice(users), text(rng, 20)),
+        "add_course": lambda: helpers.add_course(rng.choice(users), text(rng, 3), text(rng, 20)),
+        "answer_question": lambda: helpers.answer_question(questions[next(counter) % len(questions)], text(rng, 10)),
+        "join_project": lambda: helpers.join_project(rng.choice(project_ids), rng.choice(users)),
+        "rate_note": lambda: (helpers.rate_note(rng.choice(note_ids), rng.choice(users)), ratings.flush()),
+    }
+
+def bench_helpers(users, iterations, seed=0):
+    results = {}
+    cases = helper_cases(users, random.Random(seed))
+    for name, fn in cases.items():
+        results[name] = measure(fn, iterations)
+        if name.startswith("get_") or name == "search":
+            results[f"{name}[cached]"] = measure(fn, iterations, cold=False)
+    return results
+
+def bench_renders(users, iterations):
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        print("streamlit is not installed; skipping section renders")
+        return {}
+    results = {}
+    for section in SECTIONS:
+        samples = []
+        for _ in range(iterations):
+            cache.clear()
+            at = AppTest.from_file(APP, default_timeout=60)
+            at.session_state["logged_in"] = True
+            at.session_state["username"] = random.choice(users)
+            at.run()
+            at.sidebar.selectbox[0].select("Login").run()
+            started = time.perf_counter()
+            at.sidebar.radio[0].set_value(section).run()
+            samples.append(time.perf_counter() - started)
+            if at.exception:
+                raise RuntimeError(f"{section} render failed: {at.exception[0].message}")
+        results[f"render:{section}"] = summarize(samples)
+    return results
+
+def bench_sessions(users, sessions, duration, seed=0):
+    # Each simulated session browses (mostly reads, some writes) as fast as
+    # it can for `duration` seconds; the cache stays on, as in production
+    cases = helper_cases(users, random.Random(seed))
+    reads = [n for n in cases if n.startswith("get_") or n == "search"]
+    writes = [n for n in cases if n not in reads]
+    samples, lock = [], threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def session(index):
+        rng = random.Random(seed + index)
+        local = []
+        while time.perf_counter() < deadline:
+            name = rng.choice(writes) if rng.random() < 0.1 else rng.choice(reads)
+            started = time.perf_counter()
+            cases[name]()
+            local.append(time.perf_counter() - started)
+        with lock:
+            samples.extend(local)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        list(pool.map(session, range(sessions)))
+    return {f"sessions[{sessions}]": summarize(samples, time.perf_counter() - started)}
+
+# ---------------- BASELINES ----------------
+def compare(results, baseline, tolerance):
+    # Returns [(name, metric, old, new)] for p95 latencies that grew by more
+    # than `tolerance` (a fraction)
+    regressions = []
+    for name, new in results.items():
+        old = baseline.get("results", {}).get(name)
+        if old and new["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            regressions.append((name, "p95_ms", old["p95_ms"], new["p95_ms"]))
+    return regressions
+
+def print_table(results):
+    print(f"{'case':<32}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>12}")
+    for name, r in results.items():
+        print(f"{name:<32}{r['n']:>6}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['ops_per_s']:>12,.0f}")
+
+# ---------------- CLI ----------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark SkillSync against a synthetic campus.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--users", type=int, help="override the scale's user count (other counts scale with it)")
+    parser.add_argument("--iterations", type=int, default=50, help="timed calls per helper")
+    parser.add_argument("--renders", type=int, default=3, help="AppTest runs per section (0 to skip)")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent simulated sessions (0 to skip)")
+    parser.add_argument("--duration", type=float, default=10, help="seconds the concurrent sessions run")
+    parser.add_argument("--workdir", help="where to build the data (default: a fresh temp dir, removed after)")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="compare against a saved JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 growth vs the baseline")
+    args = parser.parse_args()
+
+    scale = dict(SCALES[args.scale])
+    if args.users:
+        factor = args.users / scale["users"]
+        scale = {k: max(1, int(v * factor)) for k, v in scale.items()}
+    here = os.getcwd()
+    workdir = args.workdir or tempfile.mkdtemp(prefix="skillsync-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    shutil.copy(os.path.join(os.path.dirname(APP), "image.jpg"), workdir)
+    os.chdir(workdir)
+    # Everything the app touches lands in the scratch directory; background
+    # job workers stay off so they don't add noise to the timings
+    db.DB_PATH = os.path.abspath("student_connectivity.db")
+    blobstore.BLOB_ROOT = os.path.abspath("blobs")
+    os.environ["SKILLSYNC_JOB_WORKERS"] = "0"
+    try:
+        migrations.migrate()
+        started = time.perf_counter()
+        users = generate(scale)
+        print(f"generated {args.scale} campus {scale} in {time.perf_counter() - started:.1f}s")
+        results = bench_helpers(users, args.iterations)
+        if args.renders:
+            results.update(bench_renders(users, args.renders))
+        if args.sessions:
+            results.update(bench_sessions(users, args.sessions, args.duration))
+        ratings.flush()
+        db.close_all()
+    finally:
+        os.chdir(here)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(results)
+    report = {"meta": {"scale": scale, "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                       "machine": platform.machine(), "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+              "results": results}
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, metric, old, new in regressions:
+            print(f"REGRESSION {name}: {metric} {old:.2f} -> {new:.2f}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"no p95 regressions beyond {args.tolerance:.0%}")
@@ -0,0 +1,84 @@
+import argparse
+import os
+import time
+
+import db
+import uploads
+
+# ---------------- CONFIG ----------------
+# Uploaded files are stored once per distinct content, under their SHA-256:
+# blobs/ab/cd/abcd1234...  The blobs table counts how many rows (notes,
+# podcasts, profile pictures) point at each one; triggers keep the count
+# current and gc() removes files nobody references any more.
+BLOB_ROOT = os.environ.get("SKILLSYNC_BLOBS", "blobs")
+TEMP_MAX_AGE = 3600
+
+def blob_path(sha):
+    return os.path.join(BLOB_ROOT, sha[:2], sha[2:4], sha)
+
+# ---------------- WRITING ----------------
+def stage(fileobj, kind=None):
+    # Streams the upload into a temp file inside the store and returns
+    # (temp_path, sha, size); nothing is visible until commit()
+    return uploads.stream_to_temp(fileobj, kind, BLOB_ROOT)
+
+def commit(conn, staged):
+    # Call inside the write transaction that stores the referencing row, so
+    # gc() (which also takes the writer) can't remove the blob in between
+    tmp, sha, size = staged
+    path = blob_path(sha)
+    if os.path.exists(path):
+        os.remove(tmp)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp, path)
+    conn.execute("INSERT INTO blobs (sha256, size) VALUES (?, ?) ON CONFLICT(sha256) DO UPDATE SET size=excluded.size",
+                 (sha, size))
+    return path
+
+def discard(staged):
+    if staged and os.path.exists(staged[0]):
+        os.remove(staged[0])
+
+# ---------------- GARBAGE COLLECTION ----------------
+def gc(orphans=False):
+    # Deletes unreferenced blobs; with orphans=True also files the table
+    # doesn't know about (e.g. left by a crash between rename and commit)
+    removed = 0
+    with db.write() as conn:
+        for (sha,) in conn.execute("SELECT sha256 FROM blobs WHERE refcount <= 0").fetchall():
+            if os.path.exists(blob_path(sha)):
+                os.remove(blob_path(sha))
+            conn.execute("DELETE FROM blobs WHERE sha256=?", (sha,))
+            removed += 1
+        if orphans and os.path.isdir(BLOB_ROOT):
+            known = {row[0] for row in conn.execute("SELECT sha256 FROM blobs")}
+            cutoff = time.time() - TEMP_MAX_AGE
+            for folder, _, files in os.walk(BLOB_ROOT):
+                for name in files:
+                    path = os.path.join(folder, name)
+                    if name.startswith(".tmp-"):
+                        if os.path.getmtime(path) < cutoff:
+                            os.remove(path)
+                            removed += 1
+                    elif name not in known:
+                        os.remove(path)
+                        removed += 1
+    return removed
+
+def stats():
+    with db.read() as conn:
+        return conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(size * refcount), 0) FROM blobs").fetchone()
+
+# ---------------- CLI ----------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the SkillSync upload store.")
+    parser.add_argument("command", choices=["gc", "stats"])
+    parser.add_argument("--orphans", action="store_true", help="also remove files with no blobs row")
+    args = parser.parse_args()
+
+    if args.command == "gc":
+        print(f"removed {gc(args.orphans)} blobs")
+    else:
+        count, stored, referenced = stats()
+        print(f"{count} blobs, {stored} bytes stored for {referenced} bytes referenced")
@@ -0,0 +1,168 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import db
+import passwords
+
+# ---------------- CONFIG ----------------
+# Streams whole tables in and out as CSV or JSONL. Imports are written in
+# batches of --batch-size rows per transaction with executemany; triggers
+# keep scores, search indexes and blob counts current as rows arrive.
+# A failed import reports the offset to pass to --offset to resume.
+# Plaintext user passwords are hashed on the way in, and at the login cost
+# that is slow on purpose: ~55 ms of one core per scrypt hash, so 100,000
+# plaintext rows take about 1.5 core-hours. Hashes from an export are kept
+# as they are; for a big plaintext import pass --password-cost (e.g. 1024,
+# ~16x faster) and each row is rehashed at full cost on its first login.
+TABLES = ["users", "posts", "courses", "notes", "forum", "podcasts", "projects", "project_members",
+          "hackathons", "hackathon_participants", "note_likes"]
+BATCH_SIZE = 5000
+HASH_CHUNK = 500   # passwords hashed between progress lines
+CONFLICT_MODES = {"abort": "INSERT", "ignore": "INSERT OR IGNORE", "replace": "INSERT OR REPLACE"}
+
+def columns(table):
+    # name -> declared type
+    with db.read() as conn:
+        return {row["name"]: row["type"].upper() for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def file_format(path, fmt=None):
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in ("csv", "jsonl"):
+        raise SystemExit(f"can't tell the format of {path}; pass --format csv or jsonl")
+    return fmt
+
+def report(table, done, started, final=False):
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    end = "\n" if final else "\r"
+    # Padded to clear a longer progress line left by the password hashing
+    print(f"{table}: {done:,} rows in {elapsed:.1f}s ({done / elapsed:,.0f} rows/s)".ljust(72), end=end, file=sys.stderr)
+
+# ---------------- EXPORT ----------------
+def export_table(table, path, fmt=None, batch_size=BATCH_SIZE):
+    fmt = file_format(path, fmt)
+    started, done = time.perf_counter(), 0
+    with db.read() as conn, open(path, "w", newline="", encoding="utf-8") as out:
+        cur = conn.execute(f"SELECT * FROM {table}")
+        names = [d[0] for d in cur.description]
+        writer = csv.writer(out) if fmt == "csv" else None
+        if writer:
+            writer.writerow(names)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            if writer:
+                writer.writerows(rows)
+            else:
+                out.writelines(json.dumps(dict(zip(names, row)), ensure_ascii=False) + "\n" for row in rows)
+            done += len(rows)
+            report(table, done, started)
+    report(table, done, started, final=True)
+    return done
+
+# ---------------- IMPORT ----------------
+def hash_passwords(batch, column, cost=None, progress=None):
+    # Exported users carry hashes, which are kept as they are; plaintext
+    # passwords are hashed on every core before they are written, calling
+    # progress(hashed, total) after each chunk
+    plain = [i for i, row in enumerate(batch) if row[column] and not passwords.is_hashed(row[column])]
+    for start in range(0, len(plain), HASH_CHUNK):
+        chunk = plain[start:start + HASH_CHUNK]
+        for i, hashed in zip(chunk, passwords.hash_many([batch[i][column] for i in chunk], cost)):
+            batch[i] = batch[i][:column] + (hashed,) + batch[i][column + 1:]
+        if progress:
+            progress(start + len(chunk), len(plain))
+
+def read_records(path, fmt):
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def import_table(table, path, fmt=None, batch_size=BATCH_SIZE, offset=0, on_conflict="abort", password_cost=None):
+    fmt = file_format(path, fmt)
+    types = columns(table)
+    records = read_records(path, fmt)
+    for _ in range(offset):
+        if next(records, None) is None:
+            break
+
+    started, done, written = time.perf_counter(), 0, 0
+    names = sql = None
+    batch = []
+
+    def hashing(hashed, total):
+        print(f"{table}: {done:,} rows written; hashing passwords {hashed:,}/{total:,}",
+              end="\r", file=sys.stderr)
+
+    def flush():
+        nonlocal done, written
+        if table == "users" and "password" in names:
+            hash_passwords(batch, names.index("password"), password_cost, hashing)
+        try:
+            with db.write() as conn:
+                if on_conflict == "replace":
+                    # REPLACE deletes the row it collides with; only with
+                    # recursive_triggers on does that delete fire the DELETE
+                    # triggers that keep scores, FTS and blob counts right
+                    conn.execute("PRAGMA recursive_triggers=ON")
+                try:
+                    written += conn.executemany(sql, batch).rowcount
+                finally:
+                    if on_conflict == "replace":
+                        conn.execute("PRAGMA recursive_triggers=OFF")
+        except Exception:
+            print(f"\n{table}: batch failed; resume with --offset {offset + done}", file=sys.stderr)
+            raise
+        done += len(batch)
+        batch.clear()
+        report(table, done, started)
+
+    for record in records:
+        if names is None:
+            names = [name for name in record if name in types]
+            unknown = [name for name in record if name not in types]
+            if unknown:
+                raise SystemExit(f"{table} has no column(s) {', '.join(unknown)}")
+            marks = ", ".join("?" * len(names))
+            sql = f"{CONFLICT_MODES[on_conflict]} INTO {table} ({', '.join(names)}) VALUES ({marks})"
+        # CSV has no NULL; an empty numeric field means "no value"
+        batch.append(tuple(None if record.get(name) == "" and types[name] in ("INTEGER", "REAL")
+                           else record.get(name) for name in names))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    report(table, done, started, final=True)
+    return done, written
+
+# ---------------- CLI ----------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import or export SkillSync tables as CSV or JSONL.")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("table", choices=TABLES)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows per transaction / fetch")
+    parser.add_argument("--offset", type=int, default=0, help="import: skip this many records (to resume)")
+    parser.add_argument("--on-conflict", choices=sorted(CONFLICT_MODES), default="abort",
+                        help="import: what to do with rows that collide with existing keys")
+    parser.add_argument("--password-cost", type=int,
+                        help="import: scrypt n (or pbkdf2 iterations) for plaintext passwords, "
+                             "below the login cost to speed up a big import; raised on each user's next login")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_table(args.table, args.path, args.format, args.batch_size)
+    else:
+        done, written = import_table(args.table, args.path, args.format, args.batch_size,
+                                     args.offset, args.on_conflict, args.password_cost)
+        if written < done:
+            print(f"{done - written:,} rows skipped as duplicates", file=sys.stderr)
@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+# ---------------- CONFIG ----------------
+# One process-wide cache for the read helpers, shared by every session.
+# Entries carry tags ("posts", "user:alice", ...); write helpers invalidate
+# the tags they affect, and the TTL bounds staleness from writes made
+# outside this process (CLI imports, another app instance).
+MAX_ENTRIES = 2048
+TTL_SECONDS = 60
+
+_entries = OrderedDict()  # key -> (expires_at, tags, value)
+_keys_by_tag = {}
+_generations = {}
+_lock = threading.Lock()
+_counters = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "invalidations": 0}
+
+def _freeze(value):
+    # Lists (e.g. a page of ids) become hashable cache keys
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def _drop(key):
+    _, tags, _ = _entries.pop(key)
+    for tag in tags:
+        keys = _keys_by_tag.get(tag)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del _keys_by_tag[tag]
+
+# ---------------- API ----------------
+def cached(*tags):
+    # Each tag is a string or a function of the wrapped helper's arguments
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (fn.__name__, _freeze(args), _freeze(tuple(sorted(kwargs.items()))))
+            entry_tags = tuple(tag(*args, **kwargs) if callable(tag) else tag for tag in tags)
+            now = time.monotonic()
+            with _lock:
+                entry = _entries.get(key)
+                if entry is not None and entry[0] > now:
+                    _entries.move_to_end(key)
+                    _counters["hits"] += 1
+                    return entry[2]
+                if entry is not None:
+                    _drop(key)
+                    _counters["expired"] += 1
+                _counters["misses"] += 1
+                seen = [_generations.get(tag, 0) for tag in entry_tags]
+
+            value = fn(*args, **kwargs)
+
+            with _lock:
+                # Skip storing if a write invalidated one of our tags while
+                # the query ran; the value may already be stale
+                if seen != [_generations.get(tag, 0) for tag in entry_tags]:
+                    return value
+                if key in _entries:
+                    _drop(key)
+                _entries[key] = (now + TTL_SECONDS, entry_tags, value)
+                for tag in entry_tags:
+                    _keys_by_tag.setdefault(tag, set()).add(key)
+                while len(_entries) > MAX_ENTRIES:
+                    _drop(next(iter(_entries)))
+                    _counters["evictions"] += 1
+            return value
+        return wrapper
+    return decorate
+
+def invalidate(*tags):
+    with _lock:
+        for tag in tags:
+            _generations[tag] = _generations.get(tag, 0) + 1
+            for key in list(_keys_by_tag.get(tag, ())):
+                _drop(key)
+                _counters["invalidations"] += 1
+
+def clear():
+    with _lock:
+        for tag in list(_keys_by_tag):
+            _generations[tag] = _generations.get(tag, 0) + 1
+        _entries.clear()
+        _keys_by_tag.clear()
+
+def stats():
+    with _lock:
+        lookups = _counters["hits"] + _counters["misses"]
+        return {**_counters, "entries": len(_entries),
+                "hit_rate": _counters["hits"] / lookups if lookups else 0.0}
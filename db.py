@@ -0,0 +1,171 @@
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import metrics
+
+# ---------------- CONFIG ----------------
+DB_PATH = os.environ.get("SKILLSYNC_DB", "student_connectivity.db")
+READ_POOL_SIZE = int(os.environ.get("SKILLSYNC_READ_POOL", "8"))
+BUSY_TIMEOUT_MS = 5000
+
+# ---------------- CONNECTIONS ----------------
+# Readers come from a bounded pool so each script thread gets its own
+# connection for the duration of a query; all writes go through a single
+# writer connection guarded by a lock. WAL lets readers run while a write
+# is in progress instead of queueing behind it.
+_readers = queue.LifoQueue()
+_reader_slots = threading.BoundedSemaphore(READ_POOL_SIZE)
+_write_lock = threading.RLock()
+_writer = None
+_depth = 0          # nesting of write() scopes on the thread holding the lock
+_after_commit = []
+
+def connect(path=None, readonly=False):
+    # metrics.Connection counts statements, rows and time for every query
+    conn = sqlite3.connect(path or DB_PATH, check_same_thread=False, timeout=BUSY_TIMEOUT_MS / 1000,
+                           factory=metrics.Connection)
+    conn.row_factory = sqlite3.Row  # rows index by position or column name
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    if readonly:
+        conn.execute("PRAGMA query_only=ON")
+    return conn
+
+def get_writer():
+    global _writer
+    with _write_lock:
+        if _writer is None:
+            _writer = connect()
+            _writer.execute("PRAGMA journal_mode=WAL")
+            # In WAL mode NORMAL only syncs at checkpoints; a power cut can
+            # lose the last commits but never corrupts the database
+            _writer.execute("PRAGMA synchronous=NORMAL")
+        return _writer
+
+@contextmanager
+def read():
+    if _writer is None:
+        get_writer()  # make sure the file exists and is in WAL mode first
+    with _reader_slots:
+        try:
+            conn = _readers.get_nowait()
+        except queue.Empty:
+            conn = connect(readonly=True)
+        try:
+            yield conn
+        finally:
+            _readers.put(conn)
+
+@contextmanager
+def write():
+    # A unit of work. Everything inside commits once, when the outermost
+    # write() on this thread exits, so helpers called from an enclosing
+    # write() join its transaction. Nested scopes are savepoints: an error
+    # inside one undoes only that scope's changes.
+    global _depth
+    with _write_lock:
+        conn = get_writer()
+        if _depth == 0:
+            conn.execute("BEGIN IMMEDIATE")
+        else:
+            conn.execute(f"SAVEPOINT sp{_depth}")
+        _depth += 1
+        try:
+            yield conn
+        except BaseException:
+            _depth -= 1
+            if _depth:
+                conn.execute(f"ROLLBACK TO sp{_depth}")
+                conn.execute(f"RELEASE sp{_depth}")
+            else:
+                conn.rollback()
+                _after_commit.clear()
+            raise
+        _depth -= 1
+        if _depth:
+            conn.execute(f"RELEASE sp{_depth}")
+            return
+        try:
+            conn.commit()
+        finally:
+            callbacks = _after_commit[:]
+            _after_commit.clear()
+    for fn, args in callbacks:
+        fn(*args)
+
+def on_commit(fn, *args):
+    # Runs fn(*args) once the current unit of work commits (dropped if it
+    # rolls back), or right away outside of one
+    with _write_lock:
+        if _depth:
+            _after_commit.append((fn, args))
+            return
+    fn(*args)
+
+def close_all():
+    global _writer
+    with _write_lock:
+        while True:
+            try:
+                _readers.get_nowait().close()
+            except queue.Empty:
+                break
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+
+# ---------------- SHORTCUTS ----------------
+def fetchone(sql, params=()):
+    with read() as conn:
+        return conn.execute(sql, params).fetchone()
+
+def fetchall(sql, params=()):
+    with read() as conn:
+        return conn.execute(sql, params).fetchall()
+
+def execute(sql, params=()):
+    with write() as conn:
+        return conn.execute(sql, params)
+
+# ---------------- CONCURRENT READS ----------------
+# Independent reads (and file stats) can run side by side: each call takes
+# its own reader from the pool on a worker thread, and SQLite releases the
+# GIL while it steps. arun() and agather() are the asyncio API; gather() is
+# the synchronous facade for script code, so plain calls like
+# get_user(name) keep working unchanged.
+_executor = ThreadPoolExecutor(max_workers=READ_POOL_SIZE, thread_name_prefix="read")
+
+def _in_rerun(rerun, fn, args, kwargs):
+    with metrics.attach(rerun):
+        return fn(*args, **kwargs)
+
+async def arun(fn, *args, **kwargs):
+    # Work done on the pool still counts towards the caller's rerun
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, _in_rerun, metrics.current_rerun(), fn, args, kwargs)
+
+async def afetchone(sql, params=()):
+    return await arun(fetchone, sql, params)
+
+async def afetchall(sql, params=()):
+    return await arun(fetchall, sql, params)
+
+async def agather(*calls):
+    # await agather((get_user, name), (get_my_projects, name)) -> [user, projects]
+    return list(await asyncio.gather(*(arun(fn, *args) for fn, *args in calls)))
+
+def gather(*calls):
+    # Same, for synchronous code: runs the calls concurrently and re-raises
+    # the first exception
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(agather(*calls))
+    # A running loop on this thread can't be re-entered; use the pool directly
+    rerun = metrics.current_rerun()
+    futures = [_executor.submit(_in_rerun, rerun, fn, args, {}) for fn, *args in calls]
+    return [future.result() for future in futures]
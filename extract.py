@@ -0,0 +1,133 @@
+import argparse
+import os
+import zipfile
+import xml.etree.ElementTree as ET
+
+import cache
+import db
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # PDFs are skipped until pypdf is installed
+    PdfReader = None
+
+# ---------------- CONFIG ----------------
+# Note files are read once, page by page, and the text goes into
+# note_pages (searched through note_pages_fts). note_meta caches the page
+# count and a preview so listings never open the file again.
+PAGE_CHARS = 3000        # txt files have no pages; split them at about this size
+PREVIEW_CHARS = 300
+WRITE_BATCH_PAGES = 20   # pages per write transaction while ingesting
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+class UnsupportedFile(Exception):
+    pass
+
+# ---------------- EXTRACTORS ----------------
+def _txt_pages(path):
+    page, size = [], 0
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            page.append(line)
+            size += len(line)
+            if size >= PAGE_CHARS:
+                yield "".join(page)
+                page, size = [], 0
+    if page:
+        yield "".join(page)
+
+def _docx_pages(path):
+    # Streams word/document.xml; explicit page breaks start a new page and
+    # long runs of text are split like txt files
+    page, size = [], 0
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as xml:
+        for event, elem in ET.iterparse(xml, events=("end",)):
+            if elem.tag == _W + "br" and elem.get(_W + "type") == "page" and page:
+                yield "\n".join(page)
+                page, size = [], 0
+            elif elem.tag == _W + "p":
+                text = "".join(t.text or "" for t in elem.iter(_W + "t"))
+                if text:
+                    page.append(text)
+                    size += len(text)
+                elem.clear()
+                if size >= PAGE_CHARS:
+                    yield "\n".join(page)
+                    page, size = [], 0
+    if page:
+        yield "\n".join(page)
+
+def _pdf_pages(path):
+    if PdfReader is None:
+        raise UnsupportedFile("pypdf is not installed")
+    # PdfReader parses page objects lazily, so only one page's content is
+    # decoded at a time
+    reader = PdfReader(path)
+    for page in reader.pages:
+        yield page.extract_text() or ""
+
+EXTRACTORS = {".txt": _txt_pages, ".docx": _docx_pages, ".pdf": _pdf_pages}
+
+def extract_pages(path, file_name):
+    # Blobs have no extension, so the type comes from the uploaded name
+    extractor = EXTRACTORS.get(os.path.splitext(file_name or path)[1].lower())
+    if extractor is None:
+        raise UnsupportedFile(f"no extractor for {file_name}")
+    return extractor(path)
+
+# ---------------- INGESTION ----------------
+def _set_meta(conn, note_id, status, page_count=0, preview="", error=None):
+    conn.execute('''INSERT INTO note_meta (note_id, status, page_count, preview, error, updated_at)
+                    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(note_id) DO UPDATE SET status=excluded.status, page_count=excluded.page_count,
+                        preview=excluded.preview, error=excluded.error, updated_at=excluded.updated_at''',
+                 (note_id, status, page_count, preview, error))
+
+def ingest_note(note_id):
+    note = db.fetchone("SELECT id, file_path, file_name FROM notes WHERE id=?", (note_id,))
+    if note is None:
+        return None
+    with db.write() as conn:
+        conn.execute("DELETE FROM note_pages WHERE note_id=?", (note_id,))
+        _set_meta(conn, note_id, "running")
+
+    count, preview, batch = 0, "", []
+    try:
+        # Text is extracted outside the writer lock and written in batches
+        for number, text in enumerate(extract_pages(note["file_path"], note["file_name"]), start=1):
+            count = number
+            if not preview and text.strip():
+                preview = " ".join(text.split())[:PREVIEW_CHARS]
+            batch.append((note_id, number, text))
+            if len(batch) >= WRITE_BATCH_PAGES:
+                with db.write() as conn:
+                    conn.executemany("INSERT INTO note_pages (note_id, page, text) VALUES (?, ?, ?)", batch)
+                batch = []
+        with db.write() as conn:
+            conn.executemany("INSERT INTO note_pages (note_id, page, text) VALUES (?, ?, ?)", batch)
+            _set_meta(conn, note_id, "done", count, preview)
+        status = "done"
+    except UnsupportedFile as e:
+        with db.write() as conn:
+            _set_meta(conn, note_id, "unsupported", error=str(e))
+        status = "unsupported"
+    except Exception as e:
+        with db.write() as conn:
+            _set_meta(conn, note_id, "failed", count, preview, error=f"{type(e).__name__}: {e}")
+        status = "failed"
+    db.on_commit(cache.invalidate, "notes")
+    return status
+
+def pending_notes():
+    return [row[0] for row in db.fetchall(
+        "SELECT n.id FROM notes n LEFT JOIN note_meta m ON m.note_id = n.id WHERE m.note_id IS NULL ORDER BY n.id")]
+
+# ---------------- CLI ----------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract and index the text of uploaded notes.")
+    parser.add_argument("note_ids", nargs="*", type=int, help="notes to (re)ingest; default: all not yet ingested")
+    args = parser.parse_args()
+
+    for note_id in args.note_ids or pending_notes():
+        print(f"note {note_id}: {ingest_note(note_id)}")
@@ -0,0 +1,255 @@
+import sqlite3
+
+import blobstore
+import cache
+import db
+import passwords
+import ratings
+
+# ---------------- PAGINATION ----------------
+PAGE_SIZE = 20
+
+MAX_ID = 2**63 - 1
+
+# Per-row aggregates a listing can ask for:
+# name -> (child table, column referencing the listed row, expression)
+AGGREGATES = {
+    "member_count": ("project_members", "project_id", "COUNT(*)"),
+    "participant_count": ("hackathon_participants", "hackathon_id", "COUNT(*)"),
+}
+
+# The SQL of each read is a module constant (or built by a function) so
+# migrations.hot_queries() checks the plans of exactly these statements.
+def page_sql(table, aggregates=()):
+    # Each named aggregate becomes an extra column, computed by an index
+    # lookup per row on the page, in the same query
+    columns = ""
+    for name in aggregates:
+        child, ref, expr = AGGREGATES[name]
+        columns += f", (SELECT {expr} FROM {child} a WHERE a.{ref} = t.id) AS {name}"
+    return f"SELECT t.*{columns} FROM {table} t WHERE t.id < ? ORDER BY t.id DESC LIMIT ?"
+
+def get_page(table, before_id=None, limit=PAGE_SIZE, aggregates=()):
+    # Keyset pagination: newest first, continuing below the last id already
+    # shown. The first page uses the same query shape so its plan is a
+    # rowid range search too.
+    if before_id is None:
+        before_id = MAX_ID
+    return db.fetchall(page_sql(table, aggregates), (before_id, limit))
+
+# ---------------- HELPERS ----------------
+# Read helpers are cached process-wide (see cache.py); every write helper
+# invalidates exactly the tags whose results it can change, once its unit
+# of work commits. Write helpers can be combined in one `with db.write():`
+# to commit them together.
+def create_user(username, password, college):
+    try:
+        db.execute("INSERT INTO users (username, password, college, skills, bio, profile_pic) VALUES (?, ?, ?, ?, ?, ?)",
+                   (username, passwords.hash_password(password), college, "", "", ""))
+        db.on_commit(cache.invalidate, f"user:{username}")
+        return True
+    except sqlite3.IntegrityError:
+        return False
+
+USER_SQL = "SELECT * FROM users WHERE username=?"
+
+def login_user(username, password):
+    # Returns the user row or None; raises passwords.TooManyAttempts or
+    # passwords.Busy. Rows stored plaintext or with an older cost are
+    # rehashed here, the first time their owner logs in.
+    user = db.fetchone(USER_SQL, (username,))
+    ok, new_hash = passwords.login(username, password, user["password"] if user else None, legacy="plain")
+    if not ok:
+        return None
+    if new_hash:
+        db.execute("UPDATE users SET password=? WHERE username=? AND password=?",
+                   (new_hash, username, user["password"]))
+        db.on_commit(cache.invalidate, f"user:{username}")
+    return user
+
+@cache.cached(lambda username: f"user:{username}")
+def get_user(username):
+    return db.fetchone(USER_SQL, (username,))
+
+def update_profile(username, college, skills, bio, picture=None):
+    # picture is a blob staged with blobstore.stage()
+    with db.write() as conn:
+        conn.execute("UPDATE users SET college=?, skills=?, bio=? WHERE username=?",
+                     (college, skills, bio, username))
+        if picture:
+            conn.execute("UPDATE users SET profile_pic=?, profile_blob=? WHERE username=?",
+                         (blobstore.commit(conn, picture), picture[1], username))
+    db.on_commit(cache.invalidate, f"user:{username}")
+
+def add_post(username, content):
+    db.execute("INSERT INTO posts (username, content) VALUES (?, ?)", (username, content))
+    db.on_commit(cache.invalidate, "posts", "leaderboard")
+
+@cache.cached("posts")
+def get_posts(before_id=None, limit=PAGE_SIZE):
+    return get_page("posts", before_id, limit)
+
+def add_course(username, name, desc):
+    db.execute("INSERT INTO courses (username, course_name, description) VALUES (?, ?, ?)", (username, name, desc))
+    db.on_commit(cache.invalidate, "courses", "leaderboard")
+
+@cache.cached("courses")
+def get_courses(before_id=None, limit=PAGE_SIZE):
+    return get_page("courses", before_id, limit)
+
+def add_notes(username, title, staged, file_name):
+    with db.write() as conn:
+        cur = conn.execute("INSERT INTO notes (username, title, file_path, file_size, blob_sha, file_name) VALUES (?, ?, ?, ?, ?, ?)",
+                           (username, title, blobstore.commit(conn, staged), staged[2], staged[1], file_name))
+    db.on_commit(cache.invalidate, "notes", "leaderboard")
+    return cur.lastrowid
+
+@cache.cached("notes")
+def get_notes(before_id=None, limit=PAGE_SIZE):
+    return get_page("notes", before_id, limit)
+
+NOTE_META_SQL = "SELECT note_id, status, page_count, preview FROM note_meta WHERE note_id IN ({marks})"
+
+@cache.cached("notes")
+def get_note_meta(note_ids):
+    # Page count and preview cached by extract.py, for a page of notes
+    marks = ", ".join("?" * len(note_ids))
+    rows = db.fetchall(NOTE_META_SQL.format(marks=marks), tuple(note_ids))
+    return {row["note_id"]: row for row in rows}
+
+def rate_note(note_id, username, liked=True):
+    # Buffered; ratings.py writes likes in batches and invalidates the cache
+    ratings.record(note_id, username, liked)
+
+LIKED_NOTES_SQL = "SELECT note_id FROM note_likes WHERE username=? AND note_id IN ({marks})"
+
+@cache.cached(lambda username, note_ids: f"likes:{username}")
+def _liked_notes(username, note_ids):
+    marks = ", ".join("?" * len(note_ids))
+    rows = db.fetchall(LIKED_NOTES_SQL.format(marks=marks), (username, *note_ids))
+    return {row[0] for row in rows}
+
+def get_liked_notes(username, note_ids):
+    # -> (liked, counted): which of these notes the user likes, including
+    # clicks not yet written, and which of the likes notes.rating already
+    # counts; a note's displayed count is rating + liked - counted
+    counted = _liked_notes(username, note_ids)
+    liked = set(counted)
+    for note_id, state in ratings.pending(username).items():
+        if state:
+            liked.add(note_id)
+        else:
+            liked.discard(note_id)
+    return liked, counted
+
+def add_question(username, question):
+    db.execute("INSERT INTO forum (username, question, answer) VALUES (?, ?, ?)", (username, question, ""))
+    db.on_commit(cache.invalidate, "forum")
+
+@cache.cached("forum")
+def get_questions(before_id=None, limit=PAGE_SIZE):
+    return get_page("forum", before_id, limit)
+
+def answer_question(q_id, answer):
+    db.execute("UPDATE forum SET answer=? WHERE id=?", (answer, q_id))
+    db.on_commit(cache.invalidate, "forum", "leaderboard")
+
+def add_podcast(username, title, staged, file_name):
+    with db.write() as conn:
+        cur = conn.execute("INSERT INTO podcasts (username, title, file_path, blob_sha, file_name) VALUES (?, ?, ?, ?, ?)",
+                           (username, title, blobstore.commit(conn, staged), staged[1], file_name))
+    db.on_commit(cache.invalidate, "podcasts")
+    return cur.lastrowid
+
+@cache.cached("podcasts")
+def get_podcasts(before_id=None, limit=PAGE_SIZE):
+    return get_page("podcasts", before_id, limit)
+
+# ---------------- PROJECTS ----------------
+def add_project(owner, title, desc):
+    with db.write() as conn:
+        cur = conn.execute("INSERT INTO projects (title, description, owner) VALUES (?, ?, ?)", (title, desc, owner))
+        conn.execute("INSERT INTO project_members (project_id, username) VALUES (?, ?)", (cur.lastrowid, owner))
+    db.on_commit(cache.invalidate, "projects", "leaderboard")
+
+@cache.cached("projects")
+def get_projects(before_id=None, limit=PAGE_SIZE):
+    return get_page("projects", before_id, limit, aggregates=["member_count"])
+
+def join_project(project_id, username):
+    # The composite primary key makes a repeated join a no-op
+    db.execute("INSERT OR IGNORE INTO project_members (project_id, username) VALUES (?, ?)", (project_id, username))
+    db.on_commit(cache.invalidate, "projects", "leaderboard")
+
+PROJECT_MEMBERS_SQL = "SELECT project_id, username FROM project_members WHERE project_id IN ({marks})"
+
+@cache.cached("projects")
+def get_project_members(project_ids):
+    # Members of every project on the current page in one primary-key lookup
+    marks = ", ".join("?" * len(project_ids))
+    rows = db.fetchall(PROJECT_MEMBERS_SQL.format(marks=marks), tuple(project_ids))
+    members = {pid: [] for pid in project_ids}
+    for pid, user in rows:
+        members[pid].append(user)
+    return members
+
+MY_PROJECTS_SQL = """SELECT p.id, p.title FROM project_members m JOIN projects p ON p.id = m.project_id
+                     WHERE m.username=? ORDER BY p.id DESC"""
+
+@cache.cached("projects")
+def get_my_projects(username):
+    return db.fetchall(MY_PROJECTS_SQL, (username,))
+
+# ---------------- HACKATHONS ----------------
+def add_hackathon(title, desc, start_date, end_date):
+    db.execute("INSERT INTO hackathons (title, description, start_date, end_date) VALUES (?, ?, ?, ?)",
+               (title, desc, start_date, end_date))
+    db.on_commit(cache.invalidate, "hackathons")
+
+@cache.cached("hackathons")
+def get_hackathons(before_id=None, limit=PAGE_SIZE):
+    return get_page("hackathons", before_id, limit, aggregates=["participant_count"])
+
+def join_hackathon(hackathon_id, username):
+    db.execute("INSERT OR IGNORE INTO hackathon_participants (hackathon_id, username) VALUES (?, ?)", (hackathon_id, username))
+    db.on_commit(cache.invalidate, "hackathons", "leaderboard")
+
+HACKATHON_PARTICIPANTS_SQL = "SELECT hackathon_id, username FROM hackathon_participants WHERE hackathon_id IN ({marks})"
+
+@cache.cached("hackathons")
+def get_hackathon_participants(hackathon_ids):
+    marks = ", ".join("?" * len(hackathon_ids))
+    rows = db.fetchall(HACKATHON_PARTICIPANTS_SQL.format(marks=marks), tuple(hackathon_ids))
+    participants = {hid: [] for hid in hackathon_ids}
+    for hid, user in rows:
+        participants[hid].append(user)
+    return participants
+
+MY_HACKATHONS_SQL = """SELECT h.id, h.title FROM hackathon_participants hp JOIN hackathons h ON h.id = hp.hackathon_id
+                       WHERE hp.username=? ORDER BY h.id DESC"""
+
+@cache.cached("hackathons")
+def get_my_hackathons(username):
+    return db.fetchall(MY_HACKATHONS_SQL, (username,))
+
+# ---------------- LEADERBOARD ----------------
+LEADERBOARD_SIZE = 50
+
+LEADERBOARD_SQL = "SELECT username, score FROM user_scores WHERE score > 0 ORDER BY score DESC, username LIMIT ?"
+SCORE_SQL = "SELECT score FROM user_scores WHERE username=? AND score > 0"
+RANK_SQL = "SELECT COUNT(*) FROM user_scores WHERE score > ? OR (score = ? AND username < ?)"
+
+@cache.cached("leaderboard")
+def get_leaderboard(limit=LEADERBOARD_SIZE):
+    # user_scores is maintained by triggers on every scoring table
+    return db.fetchall(LEADERBOARD_SQL, (limit,))
+
+@cache.cached("leaderboard")
+def get_rank(username):
+    # (rank, score) with the same tie-break as get_leaderboard, or None
+    with db.read() as conn:
+        row = conn.execute(SCORE_SQL, (username,)).fetchone()
+        if row is None:
+            return None
+        ahead = conn.execute(RANK_SQL, (row[0], row[0], username)).fetchone()[0]
+    return ahead + 1, row[0]
@@ -0,0 +1,101 @@
+import argparse
+import os
+
+import blobstore
+import db
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # originals are shown until Pillow is installed
+    Image = None
+
+# ---------------- CONFIG ----------------
+# Profile pictures are decoded once (in a background job) into square
+# variants. Variants are named after the original blob's hash, so a URL
+# never changes meaning and browsers may cache it forever.
+THUMB_ROOT = os.environ.get("SKILLSYNC_THUMBS", "thumbs")
+THUMB_SIZES = (256, 120, 64)   # largest first; each is resized from the previous
+WEBP_QUALITY = 82
+
+THUMB_FORMAT = "webp" if Image is not None and features.check("webp") else "png"
+
+def sniff_extension(path):
+    # Uploaded originals are stored without an extension; this recovers the
+    # real one for the Content-Type
+    with open(path, "rb") as f:
+        head = f.read(12)
+    if head.startswith(b"\x89PNG"):
+        return ".png"
+    if head.startswith(b"\xff\xd8"):
+        return ".jpg"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    if head[:4] == b"GIF8":
+        return ".gif"
+    return ""
+
+def variant_path(sha, size):
+    return os.path.join(THUMB_ROOT, sha[:2], f"{sha}-{size}.{THUMB_FORMAT}")
+
+def variant_for(sha, width):
+    # Smallest existing variant at least `width` px wide (else the largest),
+    # or None when none have been made yet
+    if not sha:
+        return None
+    sizes = sorted(THUMB_SIZES)
+    for size in [s for s in sizes if s >= width] + sizes[::-1]:
+        path = variant_path(sha, size)
+        if os.path.exists(path):
+            return path
+    return None
+
+# ---------------- PIPELINE ----------------
+def make_thumbnails(sha):
+    if Image is None:
+        return "skipped: Pillow not installed"
+    if all(os.path.exists(variant_path(sha, size)) for size in THUMB_SIZES):
+        return "already made"
+    with Image.open(blobstore.blob_path(sha)) as original:
+        # JPEGs can be decoded straight at a reduced scale
+        original.draft("RGB", (THUMB_SIZES[0] * 2, THUMB_SIZES[0] * 2))
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    os.makedirs(os.path.join(THUMB_ROOT, sha[:2]), exist_ok=True)
+    for size in THUMB_SIZES:
+        image = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        path = variant_path(sha, size)
+        # Nothing is copied from the original's info, so EXIF/GPS is dropped
+        tmp = path + ".tmp"
+        if THUMB_FORMAT == "webp":
+            image.save(tmp, "WEBP", quality=WEBP_QUALITY, method=4)
+        else:
+            image.save(tmp, "PNG", optimize=True)
+        os.replace(tmp, path)
+    return f"{len(THUMB_SIZES)} {THUMB_FORMAT} variants"
+
+def missing_thumbnails():
+    rows = db.fetchall("SELECT DISTINCT profile_blob FROM users WHERE profile_blob IS NOT NULL")
+    return [row[0] for row in rows if variant_for(row[0], 0) is None]
+
+def gc():
+    # Removes variants of pictures no user points at any more
+    live = {row[0] for row in db.fetchall("SELECT profile_blob FROM users WHERE profile_blob IS NOT NULL")}
+    removed = 0
+    for folder, _, files in os.walk(THUMB_ROOT):
+        for name in files:
+            if name.split("-")[0] not in live:
+                os.remove(os.path.join(folder, name))
+                removed += 1
+    return removed
+
+# ---------------- CLI ----------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or clean up profile picture thumbnails.")
+    parser.add_argument("command", choices=["build", "gc"])
+    args = parser.parse_args()
+
+    if args.command == "build":
+        for sha in missing_thumbnails():
+            print(f"{sha[:12]}: {make_thumbnails(sha)}")
+    else:
+        print(f"removed {gc()} unused thumbnails")
@@ -0,0 +1,223 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+
+# ---------------- CONFIG ----------------
+# Background work (text extraction, thumbnails, transcoding, score rebuilds)
+# is queued in the jobs table, so it survives restarts and can be shared by
+# the app's own worker threads and any number of `python jobs.py work`
+# processes. A claimed job holds a lease, renewed while its handler runs;
+# if the worker dies the lease runs out and another worker picks the job
+# up again.
+WORKERS = int(os.environ.get("SKILLSYNC_JOB_WORKERS", "2"))
+POLL_SECONDS = 1.0
+LEASE_SECONDS = 5 * 60
+MAX_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 5
+CLAIM_BACKOFF_MAX_SECONDS = 60
+
+HANDLERS = {}
+log = logging.getLogger(__name__)
+
+def handler(kind):
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+# ---------------- QUEUE ----------------
+_wake = threading.Event()
+
+def enqueue(kind, dedupe_key=None, max_attempts=MAX_ATTEMPTS, delay=0, **payload):
+    # With a dedupe_key, a job that is already waiting absorbs the new one
+    with db.write() as conn:
+        cur = conn.execute('''INSERT OR IGNORE INTO jobs (kind, payload, dedupe_key, max_attempts, run_after)
+                              VALUES (?, ?, ?, ?, ?)''',
+                           (kind, json.dumps(payload), dedupe_key, max_attempts, time.time() + delay))
+    _wake.set()
+    return cur.lastrowid if cur.rowcount else None
+
+CLAIM_SQL = '''UPDATE jobs SET status='running', attempts=attempts + 1, worker=?,
+                   locked_until=?, updated_at=CURRENT_TIMESTAMP
+               WHERE id = (SELECT id FROM jobs
+                           WHERE (status='queued' AND run_after <= ?)
+                              OR (status='running' AND locked_until < ?)
+                           ORDER BY run_after, id LIMIT 1)
+               RETURNING id, kind, payload, attempts, max_attempts'''
+
+def claim(worker):
+    # Atomically takes the oldest due job, or one whose lease has expired
+    now = time.time()
+    with db.write() as conn:
+        return conn.execute(CLAIM_SQL, (worker, now + LEASE_SECONDS, now, now)).fetchone()
+
+def _renew_lease(job, finished):
+    # Pushes the lease forward while the handler runs, so a slow job (a long
+    # transcode) is never reclaimed and run twice at once. attempts changes
+    # if another worker did reclaim it, and then this stops renewing.
+    while not finished.wait(LEASE_SECONDS / 3):
+        try:
+            with db.write() as conn:
+                renewed = conn.execute('''UPDATE jobs SET locked_until=? WHERE id=? AND status='running'
+                                          AND attempts=?''',
+                                       (time.time() + LEASE_SECONDS, job["id"], job["attempts"])).rowcount
+        except Exception:
+            log.exception("renewing the lease of job %s failed", job["id"])
+            continue
+        if not renewed:
+            return
+
+def run_job(job):
+    finished = threading.Event()
+    threading.Thread(target=_renew_lease, args=(job, finished), name=f"job-{job['id']}-lease", daemon=True).start()
+    try:
+        fn = HANDLERS[job["kind"]]
+        result = fn(**json.loads(job["payload"]))
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=5)}"
+        with db.write() as conn:
+            if job["attempts"] < job["max_attempts"]:
+                try:
+                    conn.execute('''UPDATE jobs SET status='queued', last_error=?, run_after=?, locked_until=NULL,
+                                        updated_at=CURRENT_TIMESTAMP WHERE id=?''',
+                                 (error, time.time() + RETRY_BASE_SECONDS * 2 ** job["attempts"], job["id"]))
+                except sqlite3.IntegrityError:
+                    # A duplicate (same dedupe_key) was queued while this ran
+                    # and will do the work; this one steps aside
+                    conn.execute('''UPDATE jobs SET status='done', result='superseded by a queued duplicate',
+                                        last_error=?, locked_until=NULL, updated_at=CURRENT_TIMESTAMP WHERE id=?''',
+                                 (error, job["id"]))
+            else:
+                conn.execute('''UPDATE jobs SET status='failed', last_error=?, locked_until=NULL,
+                                    updated_at=CURRENT_TIMESTAMP WHERE id=?''', (error, job["id"]))
+        return False
+    finally:
+        finished.set()
+    with db.write() as conn:
+        conn.execute('''UPDATE jobs SET status='done', result=?, locked_until=NULL, updated_at=CURRENT_TIMESTAMP
+                        WHERE id=?''', (None if result is None else str(result), job["id"]))
+    return True
+
+def counts():
+    return dict(db.fetchall("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+
+def prune(days=7):
+    with db.write() as conn:
+        return conn.execute("DELETE FROM jobs WHERE status='done' AND updated_at < datetime('now', ?)",
+                            (f"-{days} days",)).rowcount
+
+# ---------------- WORKERS ----------------
+_started = None
+_start_lock = threading.Lock()
+
+def _dispatch(pool, slots, worker, stop):
+    backoff = POLL_SECONDS
+    while not stop.is_set():
+        slots.acquire()
+        try:
+            job = claim(worker)
+        except Exception:
+            # e.g. "database is locked" behind a migration or bulk import;
+            # the dispatcher must outlive it
+            slots.release()
+            log.exception("claiming a job failed; retrying in %gs", backoff)
+            stop.wait(backoff)
+            backoff = min(backoff * 2, CLAIM_BACKOFF_MAX_SECONDS)
+            continue
+        backoff = POLL_SECONDS
+        if job is None:
+            slots.release()
+            _wake.wait(POLL_SECONDS)
+            _wake.clear()
+            continue
+        future = pool.submit(run_job, job)
+        future.add_done_callback(lambda _: slots.release())
+
+def start(workers=WORKERS):
+    # Starts the dispatcher and worker pool once per process; returns the
+    # stop event, or None when in-app workers are disabled
+    global _started
+    with _start_lock:
+        if _started is None and workers > 0:
+            stop = threading.Event()
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+            worker = f"{os.uname().nodename}:{os.getpid()}"
+            threading.Thread(target=_dispatch, args=(pool, threading.Semaphore(workers), worker, stop),
+                             name="job-dispatcher", daemon=True).start()
+            _started = stop
+        return _started
+
+def drain(worker="drain"):
+    # Runs every due job on the calling thread; used by the CLI and benchmarks
+    done = 0
+    while True:
+        job = claim(worker)
+        if job is None:
+            return done
+        run_job(job)
+        done += 1
+
+# ---------------- JOBS ----------------
+@handler("extract_note_text")
+def _extract_note_text(note_id):
+    import extract
+    status = extract.ingest_note(note_id)
+    if status == "failed":
+        raise RuntimeError(f"text extraction failed for note {note_id}")
+    return status
+
+@handler("transcode_podcast")
+def _transcode_podcast(podcast_id):
+    import audio
+    return audio.transcode_podcast(podcast_id)
+
+@handler("profile_thumbnails")
+def _profile_thumbnails(sha):
+    import images
+    return images.make_thumbnails(sha)
+
+@handler("recompute_scores")
+def _recompute_scores():
+    import leaderboard
+    return f"{leaderboard.rebuild_scores()} users"
+
+# ---------------- CLI ----------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run or inspect SkillSync background jobs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    work = sub.add_parser("work", help="process jobs until interrupted")
+    work.add_argument("--workers", type=int, default=max(WORKERS, 1))
+    sub.add_parser("drain", help="process every due job, then exit")
+    sub.add_parser("status", help="job counts by status")
+    add = sub.add_parser("enqueue", help="queue a job, e.g. enqueue recompute_scores")
+    add.add_argument("kind", choices=sorted(HANDLERS))
+    add.add_argument("params", nargs="*", help="key=value payload entries (integers are converted)")
+    args = parser.parse_args()
+
+    if args.command == "work":
+        start(args.workers)
+        print(f"working with {args.workers} threads; Ctrl-C to stop")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "drain":
+        print(f"ran {drain()} jobs")
+    elif args.command == "status":
+        for status, count in sorted(counts().items()):
+            print(f"{status:<8} {count}")
+    else:
+        payload = {}
+        for param in args.params:
+            key, _, value = param.partition("=")
+            payload[key] = int(value) if value.lstrip("-").isdigit() else value
+        print(f"queued job {enqueue(args.kind, **payload)}")
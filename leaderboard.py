@@ -0,0 +1,55 @@
+import argparse
+
+import cache
+import db
+
+# ---------------- SCORING ----------------
+# user_scores is kept up to date by triggers (see migration 4); this is the
+# from-scratch computation used to build it and to check it.
+# Points: post 2, note 3 + its likes, course 2, answered question 4,
+# project joined 3, hackathon joined 5.
+SCORES_SQL = '''SELECT username, SUM(points) FROM (
+                    SELECT username, COUNT(*) * 2 AS points FROM posts GROUP BY username
+                    UNION ALL SELECT username, COUNT(*) * 3 + COALESCE(SUM(rating), 0) FROM notes GROUP BY username
+                    UNION ALL SELECT username, COUNT(*) * 2 FROM courses GROUP BY username
+                    UNION ALL SELECT username, COUNT(*) * 4 FROM forum WHERE answer != '' GROUP BY username
+                    UNION ALL SELECT username, COUNT(*) * 3 FROM project_members GROUP BY username
+                    UNION ALL SELECT username, COUNT(*) * 5 FROM hackathon_participants GROUP BY username
+                ) WHERE username IS NOT NULL GROUP BY username'''
+
+def rebuild_scores(conn=None):
+    if conn is None:
+        with db.write() as conn:
+            count = rebuild_scores(conn)
+        db.on_commit(cache.invalidate, "leaderboard")
+        return count
+    conn.execute("DELETE FROM user_scores")
+    conn.execute(f"INSERT INTO user_scores (username, score) {SCORES_SQL}")
+    return conn.execute("SELECT COUNT(*) FROM user_scores").fetchone()[0]
+
+def verify_scores():
+    # Returns {username: (stored, expected)} for every user that disagrees
+    with db.read() as conn:
+        expected = dict(conn.execute(SCORES_SQL).fetchall())
+        stored = dict(conn.execute("SELECT username, score FROM user_scores").fetchall())
+    mismatches = {}
+    for user in set(expected) | set(stored):
+        if stored.get(user, 0) != expected.get(user, 0):
+            mismatches[user] = (stored.get(user, 0), expected.get(user, 0))
+    return mismatches
+
+# ---------------- CLI ----------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the SkillSync leaderboard score table.")
+    parser.add_argument("command", choices=["rebuild", "verify"])
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        print(f"rebuilt scores for {rebuild_scores()} users")
+    else:
+        mismatches = verify_scores()
+        for user, (stored, expected) in sorted(mismatches.items()):
+            print(f"{user}: stored {stored}, expected {expected}")
+        if mismatches:
+            raise SystemExit(1)
+        print("user_scores is consistent")
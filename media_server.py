@@ -0,0 +1,192 @@
+import mimetypes
+import os
+import re
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlencode, urlsplit
+
+import assets
+import blobstore
+import images
+import metrics
+
+# ---------------- CONFIG ----------------
+# Streamlit embeds media into the page; this small server lets the browser
+# fetch podcasts, pictures and static images by URL, in byte ranges, and
+# cache them. It is off unless SKILLSYNC_MEDIA_URL says where browsers
+# reach it; without it source() hands files to Streamlit, which serves
+# them itself. There is no authentication, so it listens on localhost
+# only (set SKILLSYNC_MEDIA_HOST to expose it) and serves only
+# content-addressed files and podcasts; notes, with their guessable names,
+# are downloaded through Streamlit instead.
+MEDIA_HOST = os.environ.get("SKILLSYNC_MEDIA_HOST", "127.0.0.1")
+MEDIA_PORT = int(os.environ.get("SKILLSYNC_MEDIA_PORT", "8502"))
+MEDIA_URL = os.environ.get("SKILLSYNC_MEDIA_URL", "").rstrip("/")
+MEDIA_ROOTS = ["podcasts", blobstore.BLOB_ROOT, images.THUMB_ROOT, assets.ASSET_ROOT]
+CACHE_MAX_AGE = 24 * 3600
+# Files here are named by content hash and never change in place
+IMMUTABLE_ROOTS = [blobstore.BLOB_ROOT, images.THUMB_ROOT, assets.ASSET_ROOT]
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+CHUNK_SIZE = 64 * 1024
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+def media_url(path, name=None):
+    # Blobs have no extension, so the original file name rides along for
+    # the Content-Type and Content-Disposition headers
+    url = f"{MEDIA_URL}/{quote(path.replace(os.sep, '/'))}"
+    return f"{url}?{urlencode({'name': name})}" if name else url
+
+def source(path, name=None):
+    # What to give st.image / st.audio for a file: its media server URL
+    # when one is configured, otherwise the file for Streamlit to serve
+    # (read here if it has no extension to tell Streamlit its type)
+    if MEDIA_URL and serves(path):
+        return media_url(path, name)
+    if name and not os.path.splitext(path)[1]:
+        with open(path, "rb") as f:
+            return f.read()
+    return path
+
+def serves(path):
+    # True if path is a file inside one of MEDIA_ROOTS
+    path = os.path.realpath(path)
+    return os.path.isfile(path) and any(path.startswith(os.path.realpath(root) + os.sep) for root in MEDIA_ROOTS)
+
+def resolve(url_path):
+    # Map a request path to a file inside one of MEDIA_ROOTS, or None
+    path = os.path.realpath(unquote(urlsplit(url_path).path).lstrip("/"))
+    return path if serves(path) else None
+
+def cache_control(path):
+    for root in IMMUTABLE_ROOTS:
+        if path.startswith(os.path.realpath(root) + os.sep):
+            return f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    return f"public, max-age={CACHE_MAX_AGE}"
+
+def etag_for(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+def parse_range(header, size):
+    # (start, end) inclusive for a single satisfiable range, None for the
+    # whole file, or False if the range can't be satisfied
+    match = _RANGE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if first == "" and last == "":
+        return None
+    if first == "":
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+# ---------------- SERVER ----------------
+class MediaHandler(BaseHTTPRequestHandler):
+    def do_HEAD(self):
+        self.serve(send_body=False)
+
+    def do_GET(self):
+        self.serve(send_body=True)
+
+    def serve(self, send_body):
+        path = resolve(self.path)
+        if path is None:
+            self.send_error(404)
+            return
+        stat = os.stat(path)
+        etag = etag_for(stat)
+        common = {
+            "ETag": etag,
+            "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+            "Cache-Control": cache_control(path),
+            "Accept-Ranges": "bytes",
+        }
+        if etag in self.headers.get("If-None-Match", ""):
+            self.reply(304, common)
+            return
+
+        byte_range = parse_range(self.headers.get("Range"), stat.st_size)
+        # A stale If-Range means the client's partial copy is outdated
+        if self.headers.get("If-Range") not in (None, etag):
+            byte_range = None
+        if byte_range is False:
+            self.reply(416, {**common, "Content-Range": f"bytes */{stat.st_size}"})
+            return
+        if byte_range is None:
+            start, end, status = 0, stat.st_size - 1, 200
+        else:
+            (start, end), status = byte_range, 206
+            common["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+
+        name = parse_qs(urlsplit(self.path).query).get("name", [os.path.basename(path)])[0]
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.reply(status, {**common, "Content-Type": content_type, "Content-Length": str(end - start + 1),
+                            "Content-Disposition": f"inline; filename*=UTF-8''{quote(name)}"})
+        if send_body:
+            self.copy(path, start, end - start + 1)
+
+    def reply(self, status, headers):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if "Content-Length" not in headers:
+            self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def copy(self, path, start, remaining):
+        with open(path, "rb") as f:
+            f.seek(start)
+            try:
+                while remaining > 0:
+                    chunk = f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    metrics.add_file_bytes(len(chunk))
+                    remaining -= len(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                # Players routinely abort a range once they have enough
+                pass
+
+    def log_message(self, format, *args):
+        pass
+
+_server = None
+_server_lock = threading.Lock()
+
+def start(host=MEDIA_HOST, port=MEDIA_PORT):
+    # Starts the server on a daemon thread once per process, if browsers
+    # have a URL for it
+    global _server
+    with _server_lock:
+        if _server is None and MEDIA_URL:
+            try:
+                _server = ThreadingHTTPServer((host, port), MediaHandler)
+            except OSError:
+                # Another app process on this machine is already serving
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="media-server", daemon=True).start()
+        return _server
+
+def stop():
+    global _server
+    with _server_lock:
+        if _server is not None:
+            _server.shutdown()
+            _server.server_close()
+            _server = None
+
+if __name__ == "__main__":
+    if not MEDIA_URL:
+        print("note: SKILLSYNC_MEDIA_URL is not set, so the apps won't link to this server")
+    print(f"serving {', '.join(MEDIA_ROOTS)} on http://{MEDIA_HOST}:{MEDIA_PORT}")
+    ThreadingHTTPServer((MEDIA_HOST, MEDIA_PORT), MediaHandler).serve_forever()
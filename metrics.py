@@ -0,0 +1,261 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# ---------------- CONFIG ----------------
+# Every connection from db.connect() uses the Connection/Cursor classes
+# below, which count statements, rows and time spent in SQLite. Counts go
+# to process-wide totals and to the rerun running on the current thread;
+# sample7.py brackets each rerun with begin_rerun()/end_rerun(). Totals are
+# written as a Prometheus text file and shown in the Diagnostics section.
+SLOW_QUERY_MS = float(os.environ.get("SKILLSYNC_SLOW_QUERY_MS", "50"))
+METRICS_FILE = os.environ.get("SKILLSYNC_METRICS_FILE", "metrics.prom")
+EXPORT_EVERY_SECONDS = 15
+RECENT_RERUNS = 500
+RECENT_SLOW_QUERIES = 100
+RERUN_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_lock = threading.Lock()
+_local = threading.local()
+_totals = {"statements": 0, "rows": 0, "sql_seconds": 0.0, "file_bytes": 0, "slow_queries": 0}
+_reruns = deque(maxlen=RECENT_RERUNS)
+_rerun_histograms = {}   # label -> [bucket counts..., count, sum]
+_interrupted = {}        # label -> reruns cut short by an exception
+_slow_queries = deque(maxlen=RECENT_SLOW_QUERIES)
+_last_export = 0.0
+
+def _add(statements=0, rows=0, seconds=0.0, file_bytes=0):
+    current = getattr(_local, "rerun", None)
+    with _lock:
+        for counts in (_totals, current) if current is not None else (_totals,):
+            counts["statements"] += statements
+            counts["rows"] += rows
+            counts["sql_seconds"] += seconds
+            counts["file_bytes"] += file_bytes
+
+def add_file_bytes(count):
+    _add(file_bytes=count)
+
+# ---------------- DATABASE ----------------
+def _slow(conn, sql, params, seconds):
+    # The plan is fetched on the query's own connection (taking another
+    # reader could wait forever on a full pool), with recording switched
+    # off so the EXPLAIN itself isn't counted or logged
+    plan = None
+    if sql.lstrip()[:6].upper() in ("SELECT", "WITH") and not getattr(_local, "explaining", False):
+        import migrations
+        _local.explaining = True
+        try:
+            plan = migrations.explain(conn, sql, params)
+        except sqlite3.Error:
+            pass
+        finally:
+            _local.explaining = False
+    with _lock:
+        _totals["slow_queries"] += 1
+        _slow_queries.append({"at": time.strftime("%H:%M:%S"), "ms": seconds * 1000,
+                              "sql": " ".join(sql.split()), "params": repr(params)[:200], "plan": plan})
+
+class Cursor(sqlite3.Cursor):
+    # Time covers execute() and every fetch, so a slow scan is caught even
+    # when most of its work happens while rows are being read
+    def execute(self, sql, params=()):
+        self._sql, self._params, self._seconds, self._logged = sql, params, 0.0, False
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self._timed(started, 0, statements=1)
+
+    def executemany(self, sql, seq_of_params):
+        self._sql, self._params, self._seconds, self._logged = sql, "(many)", 0.0, False
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_params)
+        finally:
+            self._timed(started, 0, statements=1)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._timed(started, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._timed(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._timed(started, len(rows))
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._timed(started, 0)
+            raise
+        self._timed(started, 1)
+        return row
+
+    def _timed(self, started, rows, statements=0):
+        if getattr(_local, "explaining", False):
+            return
+        seconds = time.perf_counter() - started
+        _add(statements, rows, seconds)
+        self._seconds = getattr(self, "_seconds", 0.0) + seconds
+        if self._seconds * 1000 >= SLOW_QUERY_MS and not getattr(self, "_logged", True):
+            self._logged = True
+            _slow(self.connection, self._sql, self._params, self._seconds)
+
+class Connection(sqlite3.Connection):
+    def cursor(self, factory=Cursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+# ---------------- RERUNS ----------------
+def begin_rerun():
+    _local.rerun = {"started": time.perf_counter(), "statements": 0, "rows": 0, "sql_seconds": 0.0, "file_bytes": 0}
+
+def end_rerun(label, interrupted=False):
+    # Called from a finally block. An interrupted rerun (st.rerun(),
+    # st.stop() or an error) is kept in the recent list and counted, but
+    # left out of the wall-time histogram so it can't pull the latencies down
+    current = getattr(_local, "rerun", None)
+    if current is None:
+        return None
+    _local.rerun = None
+    seconds = time.perf_counter() - current.pop("started")
+    record = {"at": time.strftime("%H:%M:%S"), "label": label, "seconds": seconds,
+              "interrupted": interrupted, **current}
+    with _lock:
+        _reruns.append(record)
+        if interrupted:
+            _interrupted[label] = _interrupted.get(label, 0) + 1
+        else:
+            histogram = _rerun_histograms.setdefault(label, [0] * (len(RERUN_BUCKETS) + 2))
+            for i, bound in enumerate(RERUN_BUCKETS):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[-2] += 1
+            histogram[-1] += seconds
+    maybe_export()
+    return record
+
+def current_rerun():
+    return getattr(_local, "rerun", None)
+
+@contextmanager
+def attach(rerun):
+    # Counts work done on a helper thread towards the rerun that started it
+    previous = getattr(_local, "rerun", None)
+    _local.rerun = rerun
+    try:
+        yield
+    finally:
+        _local.rerun = previous
+
+@contextmanager
+def fragment(label):
+    # A fragment rerun (st.fragment) runs without the rest of the script, so
+    # it is recorded on its own; inside a full rerun it just adds to that
+    if getattr(_local, "rerun", None) is not None:
+        yield
+        return
+    begin_rerun()
+    completed = False
+    try:
+        yield
+        completed = True
+    finally:
+        end_rerun(label, interrupted=not completed)
+
+def recent_reruns():
+    with _lock:
+        return list(_reruns)
+
+def slow_queries():
+    with _lock:
+        return list(_slow_queries)
+
+def totals():
+    with _lock:
+        return dict(_totals)
+
+# ---------------- EXPORT ----------------
+def prometheus():
+    import cache
+    with _lock:
+        t = dict(_totals)
+        histograms = {label: list(h) for label, h in _rerun_histograms.items()}
+        interrupted = dict(_interrupted)
+    lines = [
+        "# HELP skillsync_sql_statements_total SQL statements executed.",
+        "# TYPE skillsync_sql_statements_total counter",
+        f"skillsync_sql_statements_total {t['statements']}",
+        "# HELP skillsync_sql_rows_total Rows fetched from SQLite.",
+        "# TYPE skillsync_sql_rows_total counter",
+        f"skillsync_sql_rows_total {t['rows']}",
+        "# HELP skillsync_sql_seconds_total Time spent executing and fetching SQL.",
+        "# TYPE skillsync_sql_seconds_total counter",
+        f"skillsync_sql_seconds_total {t['sql_seconds']:.6f}",
+        "# HELP skillsync_slow_queries_total Statements slower than the slow-query threshold.",
+        "# TYPE skillsync_slow_queries_total counter",
+        f"skillsync_slow_queries_total {t['slow_queries']}",
+        "# HELP skillsync_file_bytes_read_total Bytes of uploaded files read for users.",
+        "# TYPE skillsync_file_bytes_read_total counter",
+        f"skillsync_file_bytes_read_total {t['file_bytes']}",
+        "# HELP skillsync_rerun_seconds Script rerun wall time by section.",
+        "# TYPE skillsync_rerun_seconds histogram",
+    ]
+    for label, h in sorted(histograms.items()):
+        for bound, count in zip(RERUN_BUCKETS, h):
+            lines.append(f'skillsync_rerun_seconds_bucket{{section="{label}",le="{bound}"}} {count}')
+        lines.append(f'skillsync_rerun_seconds_bucket{{section="{label}",le="+Inf"}} {h[-2]}')
+        lines.append(f'skillsync_rerun_seconds_count{{section="{label}"}} {h[-2]}')
+        lines.append(f'skillsync_rerun_seconds_sum{{section="{label}"}} {h[-1]:.6f}')
+    lines += ["# HELP skillsync_reruns_interrupted_total Reruns cut short by st.rerun(), st.stop() or an error.",
+              "# TYPE skillsync_reruns_interrupted_total counter"]
+    for label, count in sorted(interrupted.items()):
+        lines.append(f'skillsync_reruns_interrupted_total{{section="{label}"}} {count}')
+    stats = cache.stats()
+    lines += ["# HELP skillsync_cache_events_total Read-helper cache events.",
+              "# TYPE skillsync_cache_events_total counter"]
+    for event in ("hits", "misses", "evictions", "expired", "invalidations"):
+        lines.append(f'skillsync_cache_events_total{{event="{event}"}} {stats[event]}')
+    lines += ["# HELP skillsync_cache_entries Entries in the read-helper cache.",
+              "# TYPE skillsync_cache_entries gauge",
+              f"skillsync_cache_entries {stats['entries']}"]
+    return "\n".join(lines) + "\n"
+
+def export(path=METRICS_FILE):
+    # Atomic replace, as the node_exporter textfile collector expects
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(prometheus())
+    os.replace(tmp, path)
+
+def maybe_export():
+    global _last_export
+    now = time.monotonic()
+    with _lock:
+        if not METRICS_FILE or now - _last_export < EXPORT_EVERY_SECONDS:
+            return
+        _last_export = now
+    try:
+        export()
+    except OSError:
+        pass
@@ -0,0 +1,457 @@
+import argparse
+import os
+import sqlite3
+
+import db
+import sample4_db
+
+# ---------------- MIGRATION STEPS ----------------
+# Each step runs exactly once per database, in order, inside its own
+# transaction, and is recorded in schema_version. Never edit a step that
+# has shipped; append a new one instead.
+
+def add_column(conn, table, column, decl):
+    # Older .db files may already have the column (e.g. users.is_admin)
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+def _base_tables(conn):
+    # Users table
+    conn.execute('''CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE,
+                    password TEXT,
+                    college TEXT,
+                    skills TEXT,
+                    bio TEXT,
+                    profile_pic TEXT
+                )''')
+
+    # Other tables
+    conn.execute('''CREATE TABLE IF NOT EXISTS posts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT,
+                    content TEXT
+                )''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS courses (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT,
+                    course_name TEXT,
+                    description TEXT
+                )''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS notes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT,
+                    title TEXT,
+                    file_path TEXT,
+                    rating INTEGER DEFAULT 0
+                )''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS forum (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT,
+                    question TEXT,
+                    answer TEXT
+                )''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS podcasts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT,
+                    title TEXT,
+                    file_path TEXT
+                )''')
+
+    # Projects and Hackathons
+    conn.execute('''CREATE TABLE IF NOT EXISTS projects (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title TEXT,
+                    description TEXT,
+                    owner TEXT,
+                    members TEXT
+                )''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS hackathons (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title TEXT,
+                    description TEXT,
+                    start_date TEXT,
+                    end_date TEXT,
+                    participants TEXT
+                )''')
+
+def _hot_query_indexes(conn):
+    # Author lookups and the leaderboard GROUP BY username aggregates are
+    # answered from covering indexes instead of scanning each table
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_username ON posts(username)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_courses_username ON courses(username)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_notes_username_rating ON notes(username, rating)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_podcasts_username ON podcasts(username)")
+    # Only answered questions count towards the leaderboard
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_forum_answered ON forum(username) WHERE answer != ''")
+
+def _split_csv(value):
+    return [u.strip() for u in (value or "").split(",") if u.strip()]
+
+def _membership_tables(conn):
+    # projects.members and hackathons.participants were comma-separated
+    # TEXT; the old columns are left in place but no longer written
+    conn.execute('''CREATE TABLE IF NOT EXISTS project_members (
+                    project_id INTEGER NOT NULL REFERENCES projects(id),
+                    username TEXT NOT NULL,
+                    joined_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (project_id, username)
+                ) WITHOUT ROWID''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_project_members_username ON project_members(username)")
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS hackathon_participants (
+                    hackathon_id INTEGER NOT NULL REFERENCES hackathons(id),
+                    username TEXT NOT NULL,
+                    joined_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (hackathon_id, username)
+                ) WITHOUT ROWID''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_hackathon_participants_username ON hackathon_participants(username)")
+
+    for project_id, members in conn.execute("SELECT id, members FROM projects").fetchall():
+        conn.executemany("INSERT OR IGNORE INTO project_members (project_id, username) VALUES (?, ?)",
+                         [(project_id, u) for u in _split_csv(members)])
+    for hackathon_id, participants in conn.execute("SELECT id, participants FROM hackathons").fetchall():
+        conn.executemany("INSERT OR IGNORE INTO hackathon_participants (hackathon_id, username) VALUES (?, ?)",
+                         [(hackathon_id, u) for u in _split_csv(participants)])
+
+def _score_trigger(name, event, table, username, points, when=None):
+    # Every trigger adds a (possibly negative) delta to one user's score
+    condition = f"WHEN {username} IS NOT NULL" + (f" AND ({when})" if when else "")
+    return f'''CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table} {condition}
+                BEGIN
+                    INSERT INTO user_scores (username, score) VALUES ({username}, {points})
+                    ON CONFLICT(username) DO UPDATE SET score = score + excluded.score;
+                END'''
+
+def _user_scores(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS user_scores (
+                    username TEXT PRIMARY KEY,
+                    score INTEGER NOT NULL DEFAULT 0
+                )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_user_scores_score ON user_scores(score DESC, username)")
+
+    answered = "(COALESCE({0}.answer, '') != '')"
+    for statement in [
+        _score_trigger("trg_posts_score_ins", "INSERT", "posts", "NEW.username", "2"),
+        _score_trigger("trg_posts_score_del", "DELETE", "posts", "OLD.username", "-2"),
+        _score_trigger("trg_courses_score_ins", "INSERT", "courses", "NEW.username", "2"),
+        _score_trigger("trg_courses_score_del", "DELETE", "courses", "OLD.username", "-2"),
+        _score_trigger("trg_notes_score_ins", "INSERT", "notes", "NEW.username", "3 + COALESCE(NEW.rating, 0)"),
+        _score_trigger("trg_notes_score_del", "DELETE", "notes", "OLD.username", "-3 - COALESCE(OLD.rating, 0)"),
+        _score_trigger("trg_notes_score_rating", "UPDATE OF rating", "notes", "NEW.username",
+                       "COALESCE(NEW.rating, 0) - COALESCE(OLD.rating, 0)"),
+        _score_trigger("trg_forum_score_ins", "INSERT", "forum", "NEW.username", "4", answered.format("NEW")),
+        _score_trigger("trg_forum_score_del", "DELETE", "forum", "OLD.username", "-4", answered.format("OLD")),
+        _score_trigger("trg_forum_score_answer", "UPDATE OF answer", "forum", "NEW.username",
+                       f"4 * ({answered.format('NEW')} - {answered.format('OLD')})"),
+        _score_trigger("trg_project_members_score_ins", "INSERT", "project_members", "NEW.username", "3"),
+        _score_trigger("trg_project_members_score_del", "DELETE", "project_members", "OLD.username", "-3"),
+        _score_trigger("trg_hackathon_participants_score_ins", "INSERT", "hackathon_participants", "NEW.username", "5"),
+        _score_trigger("trg_hackathon_participants_score_del", "DELETE", "hackathon_participants", "OLD.username", "-5"),
+    ]:
+        conn.execute(statement)
+
+    import leaderboard
+    leaderboard.rebuild_scores(conn)
+
+def _note_file_sizes(conn):
+    # Listings show the size without touching the file
+    add_column(conn, "notes", "file_size", "INTEGER")
+    for note_id, path in conn.execute("SELECT id, file_path FROM notes WHERE file_size IS NULL").fetchall():
+        if path and os.path.exists(path):
+            conn.execute("UPDATE notes SET file_size=? WHERE id=?", (os.path.getsize(path), note_id))
+
+def _blob_ref_triggers(table, column):
+    # blobs.refcount follows every row that points at a blob
+    increment = f'''INSERT INTO blobs (sha256, refcount) SELECT NEW.{column}, 1 WHERE NEW.{column} IS NOT NULL
+                   ON CONFLICT(sha256) DO UPDATE SET refcount = refcount + 1;'''
+    decrement = f"UPDATE blobs SET refcount = refcount - 1 WHERE sha256 = OLD.{column};"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_blob_ins AFTER INSERT ON {table} BEGIN {increment} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_blob_del AFTER DELETE ON {table} BEGIN {decrement} END",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_blob_upd AFTER UPDATE OF {column} ON {table}
+            WHEN OLD.{column} IS NOT NEW.{column} BEGIN {decrement} {increment} END""",
+    ]
+
+def _blob_store(conn):
+    import blobstore
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS blobs (
+                    sha256 TEXT PRIMARY KEY,
+                    size INTEGER,
+                    refcount INTEGER NOT NULL DEFAULT 0,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+                ) WITHOUT ROWID''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_blobs_unreferenced ON blobs(refcount) WHERE refcount <= 0")
+    for table in ["notes", "podcasts"]:
+        add_column(conn, table, "blob_sha", "TEXT")
+        add_column(conn, table, "file_name", "TEXT")
+    add_column(conn, "users", "profile_blob", "TEXT")
+    for table, column in [("notes", "blob_sha"), ("podcasts", "blob_sha"), ("users", "profile_blob")]:
+        for statement in _blob_ref_triggers(table, column):
+            conn.execute(statement)
+
+    # Existing uploads are copied into the store; the originals are left in
+    # place and can be deleted once the upgrade is checked
+    for table in ["notes", "podcasts"]:
+        for row_id, path in conn.execute(f"SELECT id, file_path FROM {table} WHERE blob_sha IS NULL").fetchall():
+            if path and os.path.isfile(path):
+                with open(path, "rb") as f:
+                    staged = blobstore.stage(f)
+                conn.execute(f"UPDATE {table} SET file_path=?, blob_sha=?, file_name=? WHERE id=?",
+                             (blobstore.commit(conn, staged), staged[1], os.path.basename(path), row_id))
+    for user_id, username in conn.execute("SELECT id, username FROM users WHERE profile_blob IS NULL").fetchall():
+        path = f"profile_pics/{username}.png"
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                staged = blobstore.stage(f)
+            conn.execute("UPDATE users SET profile_pic=?, profile_blob=? WHERE id=?",
+                         (blobstore.commit(conn, staged), staged[1], user_id))
+
+def _fts_index(conn, table, columns):
+    # External-content FTS5 table over table(columns), synced by triggers
+    # that only fire when an indexed column changes (not e.g. on every like)
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    new = ", ".join(f"NEW.{c}" for c in columns)
+    old = ", ".join(f"OLD.{c}" for c in columns)
+    delete = f"INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', OLD.id, {old});"
+    insert = f"INSERT INTO {fts} (rowid, {cols}) VALUES (NEW.id, {new});"
+    conn.execute(f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                     {cols}, content='{table}', content_rowid='id',
+                     tokenize='unicode61 remove_diacritics 2', prefix='2 3')""")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{fts}_ins AFTER INSERT ON {table} BEGIN {insert} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{fts}_del AFTER DELETE ON {table} BEGIN {delete} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{fts}_upd AFTER UPDATE OF {cols} ON {table} BEGIN {delete} {insert} END")
+    conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+def _full_text_search(conn):
+    _fts_index(conn, "posts", ["content"])
+    _fts_index(conn, "courses", ["course_name", "description"])
+    _fts_index(conn, "forum", ["question", "answer"])
+    _fts_index(conn, "notes", ["title"])
+
+def _note_text(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS note_pages (
+                    id INTEGER PRIMARY KEY,
+                    note_id INTEGER NOT NULL REFERENCES notes(id),
+                    page INTEGER NOT NULL,
+                    text TEXT
+                )''')
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_note_pages_note_page ON note_pages(note_id, page)")
+    _fts_index(conn, "note_pages", ["text"])
+    conn.execute('''CREATE TABLE IF NOT EXISTS note_meta (
+                    note_id INTEGER PRIMARY KEY REFERENCES notes(id),
+                    status TEXT NOT NULL,
+                    page_count INTEGER DEFAULT 0,
+                    preview TEXT DEFAULT '',
+                    error TEXT,
+                    updated_at TEXT
+                )''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS trg_notes_text_del AFTER DELETE ON notes
+                    BEGIN
+                        DELETE FROM note_pages WHERE note_id = OLD.id;
+                        DELETE FROM note_meta WHERE note_id = OLD.id;
+                    END''')
+
+def _job_queue(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL DEFAULT '{}',
+                    dedupe_key TEXT,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL DEFAULT 3,
+                    run_after REAL NOT NULL,
+                    worker TEXT,
+                    locked_until REAL,
+                    result TEXT,
+                    last_error TEXT,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )''')
+    # Workers poll for due jobs; only waiting jobs are deduplicated
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_run_after ON jobs(status, run_after)")
+    conn.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs(kind, dedupe_key)
+                    WHERE status = 'queued' AND dedupe_key IS NOT NULL''')
+
+def _note_likes(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS note_likes (
+                    note_id INTEGER NOT NULL REFERENCES notes(id),
+                    username TEXT NOT NULL,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (note_id, username)
+                ) WITHOUT ROWID''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_note_likes_username ON note_likes(username)")
+    # Likes given before per-user records existed can't be attributed; they
+    # stay in base_rating, and notes.rating = base_rating + likes from here on
+    add_column(conn, "notes", "base_rating", "INTEGER DEFAULT 0")
+    conn.execute("UPDATE notes SET base_rating = COALESCE(rating, 0)")
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS trg_note_likes_ins AFTER INSERT ON note_likes
+                    BEGIN UPDATE notes SET rating = rating + 1 WHERE id = NEW.note_id; END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS trg_note_likes_del AFTER DELETE ON note_likes
+                    BEGIN UPDATE notes SET rating = rating - 1 WHERE id = OLD.note_id; END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS trg_notes_likes_del AFTER DELETE ON notes
+                    BEGIN DELETE FROM note_likes WHERE note_id = OLD.id; END''')
+
+def _admin_flag(conn):
+    # Admins see the Diagnostics section; grant with
+    # UPDATE users SET is_admin=1 WHERE username=...
+    add_column(conn, "users", "is_admin", "INTEGER DEFAULT 0")
+
+MIGRATIONS = [
+    (1, "base tables", _base_tables),
+    (2, "indexes for hot queries", _hot_query_indexes),
+    (3, "project members and hackathon participants join tables", _membership_tables),
+    (4, "materialized user_scores maintained by triggers", _user_scores),
+    (5, "notes.file_size", _note_file_sizes),
+    (6, "content-addressed upload store", _blob_store),
+    (7, "full-text search indexes", _full_text_search),
+    (8, "extracted note text", _note_text),
+    (9, "background job queue", _job_queue),
+    (10, "per-user note likes", _note_likes),
+    (11, "users.is_admin", _admin_flag),
+]
+
+# ---------------- RUNNER ----------------
+def _ensure_version_table(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT,
+                    applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )''')
+
+def current_version(conn):
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+def migrate(target=None):
+    applied = []
+    with db.write() as conn:
+        _ensure_version_table(conn)
+    for version, name, step in MIGRATIONS:
+        if target is not None and version > target:
+            break
+        # write() begins IMMEDIATE, taking the write lock before re-checking,
+        # so two processes starting together can't both apply the same step
+        with db.write() as conn:
+            if version <= current_version(conn):
+                continue
+            step(conn)
+            conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (version, name))
+        applied.append((version, name))
+    return applied
+
+def status():
+    with db.write() as conn:
+        _ensure_version_table(conn)
+        done = dict(conn.execute("SELECT version, applied_at FROM schema_version").fetchall())
+    return [(version, name, done.get(version)) for version, name, _ in MIGRATIONS]
+
+# ---------------- QUERY PLANS ----------------
+def hot_queries():
+    # The statements the app runs on each render (helpers.py), the job claim
+    # every worker polls with, and the leaderboard rebuild aggregate, with
+    # sample parameters. Built from the modules' own SQL constants, so the
+    # check explains exactly what the app executes.
+    import helpers
+    import jobs
+    import leaderboard
+    page = (helpers.MAX_ID, helpers.PAGE_SIZE)
+    return {
+        "get_user": (helpers.USER_SQL, ("someone",)),
+        "get_posts": (helpers.page_sql("posts"), page),
+        "get_courses": (helpers.page_sql("courses"), page),
+        "get_notes": (helpers.page_sql("notes"), page),
+        "get_questions": (helpers.page_sql("forum"), page),
+        "get_podcasts": (helpers.page_sql("podcasts"), page),
+        "get_projects": (helpers.page_sql("projects", ["member_count"]), page),
+        "get_hackathons": (helpers.page_sql("hackathons", ["participant_count"]), page),
+        "leaderboard_top": (helpers.LEADERBOARD_SQL, (helpers.LEADERBOARD_SIZE,)),
+        "leaderboard_score": (helpers.SCORE_SQL, ("someone",)),
+        "leaderboard_rank": (helpers.RANK_SQL, (10, 10, "someone")),
+        "project_members": (helpers.PROJECT_MEMBERS_SQL.format(marks="?, ?"), (1, 2)),
+        "hackathon_participants": (helpers.HACKATHON_PARTICIPANTS_SQL.format(marks="?, ?"), (1, 2)),
+        "note_meta": (helpers.NOTE_META_SQL.format(marks="?, ?"), (1, 2)),
+        "my_projects": (helpers.MY_PROJECTS_SQL, ("someone",)),
+        "my_hackathons": (helpers.MY_HACKATHONS_SQL, ("someone",)),
+        "liked_notes": (helpers.LIKED_NOTES_SQL.format(marks="?, ?"), ("someone", 1, 2)),
+        "job_claim": (jobs.CLAIM_SQL, ("worker", 0, 0, 0)),
+        "leaderboard_rebuild": (leaderboard.SCORES_SQL, ()),
+    }
+
+def explain(conn, sql, params=()):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+def is_full_scan(detail):
+    # SCAN reads the whole table, or the whole index with USING [COVERING]
+    # INDEX (which only saves a sort or the table lookups); SEARCH seeks to
+    # the rows it needs
+    return detail.startswith("SCAN ") and detail != "SCAN CONSTANT ROW"
+
+# Queries that read every row by design: name -> why that's acceptable
+_LISTING = "sample4.py lists every row on each render; the index only saves the sort"
+FULL_SCANS_ALLOWED = {
+    "leaderboard_rebuild": "leaderboard.rebuild_scores recounts every row; it runs as a job, not on a render",
+    "sample4.get_all_posts": _LISTING,
+    "sample4.get_courses": _LISTING,
+    "sample4.get_forum": _LISTING,
+    "sample4.get_notes": _LISTING,
+    "sample4.get_podcasts": _LISTING,
+}
+
+def _scans(conn, queries, prefix=""):
+    failures = {}
+    for name, (sql, params) in queries.items():
+        if prefix + name in FULL_SCANS_ALLOWED:
+            continue
+        scans = [d for d in explain(conn, sql, params) if is_full_scan(d)]
+        if scans:
+            failures[prefix + name] = scans
+    return failures
+
+def check_plans():
+    # sample4.py keeps its own database and schema (sample4_db.py), so its
+    # queries are explained against a fresh in-memory copy of that schema
+    with db.read() as conn:
+        failures = _scans(conn, hot_queries())
+    conn = sqlite3.connect(":memory:")
+    try:
+        sample4_db.init(conn)
+        failures.update(_scans(conn, sample4_db.HOT_QUERIES, "sample4."))
+    finally:
+        conn.close()
+    return failures
+
+# ---------------- CLI ----------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply SkillSync schema migrations.")
+    parser.add_argument("command", nargs="?", choices=["migrate", "status", "check-plans"], default="migrate")
+    parser.add_argument("--target", type=int, help="stop after this schema version")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        for version, name, applied_at in status():
+            print(f"{version:>4}  {'applied ' + applied_at if applied_at else 'pending':<28}  {name}")
+    elif args.command == "check-plans":
+        failures = check_plans()
+        for name, scans in failures.items():
+            print(f"FULL SCAN in {name}: {'; '.join(scans)}")
+        if failures:
+            raise SystemExit(1)
+        checked = len(hot_queries()) + len(sample4_db.HOT_QUERIES)
+        print(f"{checked - len(FULL_SCANS_ALLOWED)} hot queries search indexes; "
+              f"{len(FULL_SCANS_ALLOWED)} full scans allowed")
+    else:
+        applied = migrate(args.target)
+        for version, name in applied:
+            print(f"applied {version}: {name}")
+        if not applied:
+            print("schema is up to date")
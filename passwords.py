@@ -0,0 +1,241 @@
+import argparse
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# ---------------- CONFIG ----------------
+# Passwords are stored as self-describing strings, e.g.
+#   scrypt$16384$8$1$<salt>$<hash>   or   pbkdf2_sha256$600000$<salt>$<hash>
+# so the cost can be raised at any time: a login that matches a row hashed
+# with other settings, or a row in the calling app's old scheme (plaintext
+# or unsalted sha256, see _verify), stores a fresh hash. hashlib releases
+# the GIL while it hashes, so the work runs on a small pool of threads,
+# bounded so a burst of logins queues instead of starving page renders.
+ALGORITHM = os.environ.get("SKILLSYNC_PASSWORD_HASH", "scrypt")   # scrypt or pbkdf2_sha256
+SCRYPT_N = int(os.environ.get("SKILLSYNC_SCRYPT_N", str(2**14)))
+SCRYPT_R = int(os.environ.get("SKILLSYNC_SCRYPT_R", "8"))
+SCRYPT_P = int(os.environ.get("SKILLSYNC_SCRYPT_P", "1"))
+PBKDF2_ITERATIONS = int(os.environ.get("SKILLSYNC_PBKDF2_ITERATIONS", "600000"))
+SALT_BYTES = 16
+HASH_BYTES = 32
+HASH_WORKERS = int(os.environ.get("SKILLSYNC_HASH_WORKERS", str(os.cpu_count() or 1)))
+HASH_QUEUE = HASH_WORKERS * 4     # hashes running or waiting
+QUEUE_WAIT_SECONDS = 5
+MAX_FAILURES = 5                  # failed logins per username ...
+FAILURE_WINDOW_SECONDS = 300      # ... within this many seconds
+
+class Busy(RuntimeError):
+    def __init__(self):
+        super().__init__("too many logins in progress, try again in a moment")
+
+class TooManyAttempts(RuntimeError):
+    def __init__(self, retry_after):
+        super().__init__(f"too many failed logins, try again in {int(retry_after) + 1} seconds")
+        self.retry_after = retry_after
+
+# ---------------- HASHING ----------------
+def _b64(raw):
+    return base64.b64encode(raw).decode().rstrip("=")
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+def _scrypt(password, salt, n, r, p, length):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=2 * 128 * r * (n + p), dklen=length)
+
+def _pbkdf2(password, salt, iterations, length):
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations, length)
+
+def _hash(password, cost=None):
+    # cost overrides SCRYPT_N or PBKDF2_ITERATIONS (see hash_many)
+    salt = secrets.token_bytes(SALT_BYTES)
+    if ALGORITHM == "pbkdf2_sha256":
+        iterations = cost or PBKDF2_ITERATIONS
+        digest = _pbkdf2(password, salt, iterations, HASH_BYTES)
+        return f"pbkdf2_sha256${iterations}${_b64(salt)}${_b64(digest)}"
+    n = cost or SCRYPT_N
+    digest = _scrypt(password, salt, n, SCRYPT_R, SCRYPT_P, HASH_BYTES)
+    return f"scrypt${n}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+
+_FIELDS = {"scrypt": 6, "pbkdf2_sha256": 4}
+
+def _parse(stored):
+    # -> (scheme, cost numbers, salt, digest), or None when stored is not a
+    # well-formed hash: a legacy plaintext password may well start "scrypt$"
+    fields = stored.split("$")
+    if len(fields) != _FIELDS.get(fields[0]):
+        return None
+    try:
+        cost = tuple(int(field) for field in fields[1:-2])
+        salt, digest = _unb64(fields[-2]), _unb64(fields[-1])
+    except ValueError:
+        return None
+    if not salt or not digest or min(cost) < 1:
+        return None
+    if fields[0] == "scrypt" and (cost[0] < 2 or cost[0] & (cost[0] - 1)):
+        return None   # hashlib.scrypt only takes a power of two
+    return fields[0], cost, salt, digest
+
+def _verify(password, stored, legacy):
+    # -> (matches, should be rehashed with the current settings)
+    parsed = _parse(stored)
+    if parsed and parsed[0] == "scrypt":
+        _, (n, r, p), salt, expected = parsed
+        ok = hmac.compare_digest(_scrypt(password, salt, n, r, p, len(expected)), expected)
+        current = ALGORITHM == "scrypt" and (n, r, p) == (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        return ok, ok and not current
+    if parsed:
+        _, (iterations,), salt, expected = parsed
+        ok = hmac.compare_digest(_pbkdf2(password, salt, iterations, len(expected)), expected)
+        current = ALGORITHM == "pbkdf2_sha256" and iterations == PBKDF2_ITERATIONS
+        return ok, ok and not current
+    # Rows from before this module, in the one scheme the calling app used:
+    # "sha256" (sample4.py, unsalted hex) or "plain" (the others). Only that
+    # scheme is tried, so a leaked sha256 digest is not itself a password.
+    if legacy == "sha256":
+        candidate = hashlib.sha256(password.encode()).hexdigest()
+    elif legacy == "plain":
+        candidate = password
+    else:
+        raise ValueError(f"unknown legacy password scheme {legacy!r}")
+    ok = hmac.compare_digest(stored.encode(), candidate.encode())
+    return ok, ok
+
+def is_hashed(stored):
+    return bool(stored) and _parse(stored) is not None
+
+# ---------------- WORKER POOL ----------------
+_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="hash")
+_slots = threading.BoundedSemaphore(HASH_QUEUE)
+_dummy = None
+
+def _run(fn, *args):
+    if not _slots.acquire(timeout=QUEUE_WAIT_SECONDS):
+        raise Busy()
+    try:
+        future = _pool.submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future.result()
+
+def hash_password(password):
+    return _run(_hash, password)
+
+def verify(password, stored, legacy):
+    # An unknown user still costs one hash, so response time doesn't tell
+    # which usernames exist
+    global _dummy
+    if not stored:
+        if _dummy is None:
+            _dummy = hash_password(secrets.token_hex(8))
+        _run(_verify, password, _dummy, legacy)
+        return False, False
+    return _run(_verify, password, stored, legacy)
+
+def hash_many(passwords, cost=None):
+    # For imports: every worker busy, no queue limit. A lower cost than the
+    # configured one makes a big import affordable; those rows are rehashed
+    # at full cost the first time their owner logs in.
+    return list(_pool.map(lambda password: _hash(password, cost), passwords))
+
+# ---------------- RATE LIMIT ----------------
+# Failed logins per username in a sliding window, kept in memory: a
+# restart forgets them, which is fine for slowing down guessing.
+_failures = {}   # username -> deque of failure times
+_failures_lock = threading.Lock()
+
+def retry_after(username):
+    now = time.monotonic()
+    with _failures_lock:
+        times = _failures.get(username)
+        while times and now - times[0] >= FAILURE_WINDOW_SECONDS:
+            times.popleft()
+        if not times:
+            _failures.pop(username, None)
+            return 0
+        if len(times) < MAX_FAILURES:
+            return 0
+        return FAILURE_WINDOW_SECONDS - (now - times[0])
+
+def record_failure(username):
+    now = time.monotonic()
+    with _failures_lock:
+        if len(_failures) > 10000:
+            for name in [name for name, times in _failures.items() if now - times[-1] >= FAILURE_WINDOW_SECONDS]:
+                del _failures[name]
+        _failures.setdefault(username, deque(maxlen=MAX_FAILURES)).append(now)
+
+def clear_failures(username):
+    with _failures_lock:
+        _failures.pop(username, None)
+
+def login(username, password, stored, legacy):
+    # -> (ok, new_hash); new_hash is set when the caller should store it in
+    # place of stored. Raises TooManyAttempts while the username is locked.
+    wait = retry_after(username)
+    if wait:
+        raise TooManyAttempts(wait)
+    ok, rehash = verify(password, stored, legacy)
+    if not ok:
+        record_failure(username)
+        return False, None
+    clear_failures(username)
+    return True, hash_password(password) if rehash else None
+
+# ---------------- BENCHMARK ----------------
+def bench(seconds=5.0, threads=None):
+    # Logins/second through the pool: each login is one verify against a
+    # current-cost hash
+    threads = threads or HASH_WORKERS
+    stored = _hash("correct horse")
+    done = 0
+    done_lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        nonlocal done
+        while time.perf_counter() < deadline:
+            _run(_verify, "correct horse", stored, "plain")
+            with done_lock:
+                done += 1
+
+    started = time.perf_counter()
+    clients = [threading.Thread(target=client) for _ in range(threads)]
+    for t in clients:
+        t.start()
+    for t in clients:
+        t.join()
+    elapsed = time.perf_counter() - started
+    return {"logins": done, "seconds": elapsed, "per_second": done / elapsed,
+            "per_core": done / elapsed / min(HASH_WORKERS, threads, os.cpu_count() or 1)}
+
+# ---------------- CLI ----------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hash passwords and measure login throughput.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("hash", help="hash a password read from stdin")
+    bench_parser = sub.add_parser("bench", help="logins/second with the current settings")
+    bench_parser.add_argument("--seconds", type=float, default=5.0)
+    bench_parser.add_argument("--threads", type=int, help="concurrent logins (default: one per worker)")
+    args = parser.parse_args()
+
+    if args.command == "hash":
+        print(hash_password(input().rstrip("\n")))
+    else:
+        if ALGORITHM == "pbkdf2_sha256":
+            print(f"pbkdf2_sha256, {PBKDF2_ITERATIONS} iterations, {HASH_WORKERS} workers")
+        else:
+            print(f"scrypt n={SCRYPT_N} r={SCRYPT_R} p={SCRYPT_P} "
+                  f"({128 * SCRYPT_N * SCRYPT_R // 1024 // 1024} MB each), {HASH_WORKERS} workers")
+        result = bench(args.seconds, args.threads)
+        print(f"{result['logins']} logins in {result['seconds']:.1f}s: "
+              f"{result['per_second']:.1f}/s, {result['per_core']:.1f}/s per core")
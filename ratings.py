@@ -0,0 +1,105 @@
+import argparse
+import atexit
+import logging
+import threading
+
+import cache
+import db
+
+# ---------------- CONFIG ----------------
+# Likes are recorded per user in note_likes (one row per note and user),
+# and triggers keep notes.rating = base_rating + number of likes (see
+# migration 10). Clicks are buffered in memory and written in batches:
+# a burst of likes costs one transaction, and repeated clicks by the same
+# user on the same note collapse to their final state.
+FLUSH_SECONDS = 0.5
+FLUSH_SIZE = 500
+
+_pending = {}   # (note_id, username) -> True for like, False for unlike
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_wake = threading.Event()
+_flusher = None
+log = logging.getLogger(__name__)
+
+# ---------------- BUFFER ----------------
+def record(note_id, username, liked=True):
+    global _flusher
+    with _lock:
+        _pending[(note_id, username)] = liked
+        if _flusher is None:
+            _flusher = threading.Thread(target=_run, name="ratings-flush", daemon=True)
+            _flusher.start()
+        if len(_pending) >= FLUSH_SIZE:
+            _wake.set()
+
+def pending(username):
+    # This user's likes that are not written yet, so the UI can show them
+    with _lock:
+        return {note_id: liked for (note_id, user), liked in _pending.items() if user == username}
+
+def flush():
+    global _pending
+    with _flush_lock:
+        with _lock:
+            batch, _pending = _pending, {}
+        if not batch:
+            return 0
+        likes = [key for key, liked in batch.items() if liked]
+        unlikes = [key for key, liked in batch.items() if not liked]
+        try:
+            with db.write() as conn:
+                conn.executemany("INSERT OR IGNORE INTO note_likes (note_id, username) VALUES (?, ?)", likes)
+                conn.executemany("DELETE FROM note_likes WHERE note_id=? AND username=?", unlikes)
+        except Exception:
+            # Put the batch back under anything clicked since, and retry later
+            with _lock:
+                _pending = {**batch, **_pending}
+            log.exception("writing %d likes failed; kept for the next flush", len(batch))
+            raise
+        db.on_commit(cache.invalidate, "notes", "leaderboard", *{f"likes:{user}" for _, user in batch})
+        return len(batch)
+
+def _run():
+    while True:
+        _wake.wait(FLUSH_SECONDS)
+        _wake.clear()
+        try:
+            flush()
+        except Exception:
+            pass  # logged and re-queued by flush()
+
+atexit.register(flush)
+
+# ---------------- CONSISTENCY ----------------
+def verify():
+    # Returns {note_id: (stored, expected)} for notes whose counter drifted
+    rows = db.fetchall('''SELECT n.id, n.rating, n.base_rating + COUNT(l.note_id)
+                          FROM notes n LEFT JOIN note_likes l ON l.note_id = n.id
+                          GROUP BY n.id HAVING n.rating IS NOT n.base_rating + COUNT(l.note_id)''')
+    return {row[0]: (row[1], row[2]) for row in rows}
+
+def repair():
+    with db.write() as conn:
+        count = conn.execute('''UPDATE notes SET rating = base_rating +
+                                    (SELECT COUNT(*) FROM note_likes l WHERE l.note_id = notes.id)
+                                WHERE rating IS NOT base_rating +
+                                    (SELECT COUNT(*) FROM note_likes l WHERE l.note_id = notes.id)''').rowcount
+    db.on_commit(cache.invalidate, "notes", "leaderboard")
+    return count
+
+# ---------------- CLI ----------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check note like counters against note_likes.")
+    parser.add_argument("command", choices=["verify", "repair"])
+    args = parser.parse_args()
+
+    if args.command == "repair":
+        print(f"repaired {repair()} notes")
+    else:
+        mismatches = verify()
+        for note_id, (stored, expected) in sorted(mismatches.items()):
+            print(f"note {note_id}: stored {stored}, expected {expected}")
+        if mismatches:
+            raise SystemExit(1)
+        print("note ratings are consistent")
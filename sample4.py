@@ -1,94 +1,48 @@
 import streamlit as st
 import sqlite3
-import hashlib
 from datetime import datetime
 import os
 
+import media_server
+import passwords
+import sample4_db
+from uploads import UploadTooLarge, save_upload
+
 # ---------------------------
 # Database Setup
 # ---------------------------
-conn = sqlite3.connect("student_connect.db", check_same_thread=False)
+conn = sqlite3.connect(sample4_db.DB_PATH, check_same_thread=False)
 c = conn.cursor()
 
-# Users
-c.execute('''CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE,
-                password TEXT,
-                college TEXT,
-                skills TEXT,
-                bio TEXT)''')
-
-# Posts
-c.execute('''CREATE TABLE IF NOT EXISTS posts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                content TEXT,
-                timestamp TEXT,
-                FOREIGN KEY(user_id) REFERENCES users(id))''')
-
-# Courses
-c.execute('''CREATE TABLE IF NOT EXISTS courses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT,
-                title TEXT,
-                description TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-
-# Forum
-c.execute('''CREATE TABLE IF NOT EXISTS forum (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT,
-                question TEXT,
-                answer TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-
-# Notes (PDF)
-c.execute('''CREATE TABLE IF NOT EXISTS notes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT,
-                title TEXT,
-                file_path TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+@st.cache_resource
+def init_db():
+    # Tables, indexes and triggers are created once per process, not on every rerun
+    sample4_db.init(conn)
 
-# Note Ratings
-c.execute('''CREATE TABLE IF NOT EXISTS note_ratings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                note_id INTEGER,
-                username TEXT,
-                rating INTEGER,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(note_id) REFERENCES notes(id))''')
-
-# Podcasts
-c.execute('''CREATE TABLE IF NOT EXISTS podcasts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT,
-                title TEXT,
-                language TEXT,
-                file_path TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-
-conn.commit()
+init_db()
 
 # ---------------------------
 # Helper Functions
 # ---------------------------
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
 def add_user(username, password, college, skills, bio):
     c.execute("INSERT INTO users (username, password, college, skills, bio) VALUES (?,?,?,?,?)",
-              (username, hash_password(password), college, skills, bio))
+              (username, passwords.hash_password(password), college, skills, bio))
     conn.commit()
 
 def login_user(username, password):
-    c.execute("SELECT * FROM users WHERE username=? AND password=?", 
-              (username, hash_password(password)))
-    return c.fetchone()
+    # Old rows hold an unsalted sha256; they get a salted hash on login
+    c.execute(sample4_db.USER_SQL, (username,))
+    user = c.fetchone()
+    ok, new_hash = passwords.login(username, password, user[2] if user else None, legacy="sha256")
+    if not ok:
+        return None
+    if new_hash:
+        c.execute("UPDATE users SET password=? WHERE id=? AND password=?", (new_hash, user[0], user[2]))
+        conn.commit()
+    return user
 
 def get_user(username):
-    c.execute("SELECT * FROM users WHERE username=?", (username,))
+    c.execute(sample4_db.USER_SQL, (username,))
     return c.fetchone()
 
 def add_post(user_id, content):
@@ -98,9 +52,7 @@ def add_post(user_id, content):
     conn.commit()
 
 def get_all_posts():
-    c.execute("""SELECT posts.content, posts.timestamp, users.username 
-                 FROM posts JOIN users ON posts.user_id = users.id 
-                 ORDER BY posts.id DESC""")
+    c.execute(sample4_db.POSTS_SQL)
     return c.fetchall()
 
 # Courses
@@ -109,7 +61,7 @@ def add_course(username, title, description):
     conn.commit()
 
 def get_courses():
-    c.execute("SELECT username, title, description, timestamp FROM courses ORDER BY timestamp DESC")
+    c.execute(sample4_db.COURSES_SQL)
     return c.fetchall()
 
 # Forum
@@ -122,7 +74,7 @@ def add_forum_answer(q_id, answer):
     conn.commit()
 
 def get_forum():
-    c.execute("SELECT id, username, question, answer, timestamp FROM forum ORDER BY timestamp DESC")
+    c.execute(sample4_db.FORUM_SQL)
     return c.fetchall()
 
 # Notes
@@ -132,24 +84,14 @@ def add_note(username, title, file_path):
     conn.commit()
 
 def get_notes():
-    c.execute("SELECT id, username, title, file_path, timestamp FROM notes ORDER BY timestamp DESC")
+    c.execute(sample4_db.NOTES_SQL)
     return c.fetchall()
 
 # Note Ratings
 def rate_note(note_id, username, rating):
-    c.execute("SELECT * FROM note_ratings WHERE note_id=? AND username=?", (note_id, username))
-    existing = c.fetchone()
-    if existing:
-        c.execute("UPDATE note_ratings SET rating=?, timestamp=CURRENT_TIMESTAMP WHERE id=?", (rating, existing[0]))
-    else:
-        c.execute("INSERT INTO note_ratings (note_id, username, rating) VALUES (?, ?, ?)", (note_id, username, rating))
+    c.execute(sample4_db.RATE_NOTE_SQL, (note_id, username, rating))
     conn.commit()
 
-def get_avg_rating(note_id):
-    c.execute("SELECT AVG(rating) FROM note_ratings WHERE note_id=?", (note_id,))
-    avg = c.fetchone()[0]
-    return round(avg,1) if avg else None
-
 # Podcasts
 def add_podcast(username, title, language, file_path):
     c.execute("INSERT INTO podcasts (username, title, language, file_path) VALUES (?, ?, ?, ?)",
@@ -158,11 +100,34 @@ def add_podcast(username, title, language, file_path):
 
 def get_podcasts(language=None):
     if language:
-        c.execute("SELECT username, title, language, file_path, timestamp FROM podcasts WHERE language=? ORDER BY timestamp DESC", (language,))
+        c.execute(sample4_db.PODCASTS_BY_LANGUAGE_SQL, (language,))
     else:
-        c.execute("SELECT username, title, language, file_path, timestamp FROM podcasts ORDER BY timestamp DESC")
+        c.execute(sample4_db.PODCASTS_SQL)
     return c.fetchall()
 
+# Downloads
+def format_size(size):
+    for unit in ["B", "KB", "MB"]:
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+def download_on_demand(key, path, label, mime=None):
+    # Files are only read once the user asks for that one download
+    if not st.session_state.get(key):
+        st.button(label, key=f"{key}_prepare", on_click=st.session_state.__setitem__, args=(key, True))
+    else:
+        with open(path, "rb") as f:
+            st.download_button(f"💾 Save {os.path.basename(path)}", f, file_name=os.path.basename(path), mime=mime,
+                               key=f"{key}_save", on_click=st.session_state.pop, args=(key, None))
+
+@st.cache_resource
+def start_media_server():
+    media_server.start()
+
+start_media_server()
+
 # ---------------------------
 # Session State
 # ---------------------------
@@ -205,14 +170,18 @@ if not st.session_state.logged_in:
         password = st.text_input("Password", type="password")
 
         if st.button("Login"):
-            user = login_user(username, password)
-            if user:
-                st.session_state.logged_in = True
-                st.session_state.username = user[1]
-                st.session_state.user_id = user[0]
-                st.success(f"Welcome {username}!")
+            try:
+                user = login_user(username, password)
+            except (passwords.TooManyAttempts, passwords.Busy) as e:
+                st.error(str(e).capitalize() + ".")
             else:
-                st.error("Invalid username or password")
+                if user:
+                    st.session_state.logged_in = True
+                    st.session_state.username = user[1]
+                    st.session_state.user_id = user[0]
+                    st.success(f"Welcome {username}!")
+                else:
+                    st.error("Invalid username or password")
 
 # ---------------------------
 # Main App Sections
@@ -290,28 +259,25 @@ else:
         note_file = st.file_uploader("Upload PDF File", type=["pdf"])
 
         if note_file is not None:
-            os.makedirs("notes_uploads", exist_ok=True)
-            file_path = f"notes_uploads/{note_file.name}"
-            with open(file_path, "wb") as f:
-                f.write(note_file.getbuffer())
+            # The file is written once, when the note is actually shared
             if st.button("Share Note"):
-                add_note(username, note_title, file_path)
-                st.success("✅ Note shared!")
+                try:
+                    file_path = save_upload(note_file, "note", "notes_uploads", note_file.name)
+                    add_note(username, note_title, file_path)
+                    st.success("✅ Note shared!")
+                except UploadTooLarge as e:
+                    st.error(str(e))
 
         st.subheader("All Notes")
         notes = get_notes()
         for note in notes:
-            note_id, u, t, path, time = note
-            st.markdown(f"**{t}** (by {u} at {time})")
-            with open(path, "rb") as pdf_file:
-                st.download_button(
-                    label="📥 Download PDF",
-                    data=pdf_file,
-                    file_name=path.split("/")[-1],
-                    mime="application/pdf"
-                )
-
-            avg_rating = get_avg_rating(note_id)
+            note_id, u, t, path, time, avg_rating = note
+            if not os.path.exists(path):
+                st.markdown(f"**{t}** (by {u} at {time}) · file missing")
+            else:
+                st.markdown(f"**{t}** (by {u} at {time}) · {format_size(os.path.getsize(path))}")
+                download_on_demand(f"note_{note_id}", path, "📥 Download PDF", mime="application/pdf")
+
             st.write(f"⭐ Average Rating: {avg_rating if avg_rating else 'No ratings yet'}")
             user_rating = st.slider(f"Rate this note (1-5) - {t}", min_value=1, max_value=5, key=f"rate_{note_id}")
             if st.button(f"Submit Rating - {note_id}"):
@@ -327,20 +293,20 @@ else:
         podcast_file = st.file_uploader("Upload Audio File", type=["mp3", "wav"])
 
         if podcast_file is not None:
-            os.makedirs("uploads", exist_ok=True)
-            file_path = f"uploads/{podcast_file.name}"
-            with open(file_path, "wb") as f:
-                f.write(podcast_file.getbuffer())
             if st.button("Upload Podcast"):
-                add_podcast(username, podcast_title, podcast_language, file_path)
-                st.success("✅ Podcast uploaded!")
+                try:
+                    file_path = save_upload(podcast_file, "podcast", "podcasts", podcast_file.name)
+                    add_podcast(username, podcast_title, podcast_language, file_path)
+                    st.success("✅ Podcast uploaded!")
+                except UploadTooLarge as e:
+                    st.error(str(e))
 
         st.subheader("All Podcasts")
         filter_lang = st.radio("Filter by Language", ["All", "English", "Tamil"])
         podcasts = get_podcasts(None if filter_lang=="All" else filter_lang)
         for u, t, lang, path, time in podcasts:
             st.markdown(f"**{t}** ({lang}) by {u} at {time}")
-            st.audio(path)
+            st.audio(media_server.source(path))
             st.write("---")
 
     # ---------------- Logout ----------------
@@ -0,0 +1,136 @@
+
+# ---------------- CONFIG ----------------
+# Schema of the classic app (sample4.py), which keeps its own database.
+# init() runs once per process from the app, so the DDL, index and
+# trigger checks don't repeat on every Streamlit rerun.
+DB_PATH = "student_connect.db"
+
+# ---------------- SCHEMA ----------------
+def init(conn):
+    # Users
+    conn.execute('''CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE,
+                    password TEXT,
+                    college TEXT,
+                    skills TEXT,
+                    bio TEXT)''')
+
+    # Posts
+    conn.execute('''CREATE TABLE IF NOT EXISTS posts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    content TEXT,
+                    timestamp TEXT,
+                    FOREIGN KEY(user_id) REFERENCES users(id))''')
+
+    # Courses
+    conn.execute('''CREATE TABLE IF NOT EXISTS courses (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT,
+                    title TEXT,
+                    description TEXT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+
+    # Forum
+    conn.execute('''CREATE TABLE IF NOT EXISTS forum (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT,
+                    question TEXT,
+                    answer TEXT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+
+    # Notes (PDF)
+    conn.execute('''CREATE TABLE IF NOT EXISTS notes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT,
+                    title TEXT,
+                    file_path TEXT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+
+    # Note Ratings
+    conn.execute('''CREATE TABLE IF NOT EXISTS note_ratings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    note_id INTEGER,
+                    username TEXT,
+                    rating INTEGER,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY(note_id) REFERENCES notes(id))''')
+
+    # Podcasts
+    conn.execute('''CREATE TABLE IF NOT EXISTS podcasts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT,
+                    title TEXT,
+                    language TEXT,
+                    file_path TEXT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+
+    # Indexes
+    # One rating per user per note; older duplicates are dropped the first time
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name='idx_note_ratings_note_user'").fetchone():
+        conn.execute("DELETE FROM note_ratings WHERE id NOT IN (SELECT MAX(id) FROM note_ratings GROUP BY note_id, username)")
+        conn.execute("CREATE UNIQUE INDEX idx_note_ratings_note_user ON note_ratings(note_id, username)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_podcasts_language_time ON podcasts(language, timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_podcasts_time ON podcasts(timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_notes_time ON notes(timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_courses_time ON courses(timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_forum_time ON forum(timestamp)")
+
+    # Per-note rating count and sum, kept current by triggers so the notes
+    # listing reads averages in the same query instead of one AVG per note
+    conn.execute('''CREATE TABLE IF NOT EXISTS note_rating_stats (
+                    note_id INTEGER PRIMARY KEY,
+                    rating_count INTEGER NOT NULL DEFAULT 0,
+                    rating_sum INTEGER NOT NULL DEFAULT 0)''')
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name='trg_note_ratings_ins'").fetchone():
+        conn.execute("DELETE FROM note_rating_stats")
+        conn.execute('''INSERT INTO note_rating_stats (note_id, rating_count, rating_sum)
+                     SELECT note_id, COUNT(*), SUM(rating) FROM note_ratings GROUP BY note_id''')
+        conn.execute('''CREATE TRIGGER trg_note_ratings_ins AFTER INSERT ON note_ratings BEGIN
+                         INSERT INTO note_rating_stats (note_id, rating_count, rating_sum) VALUES (NEW.note_id, 1, NEW.rating)
+                         ON CONFLICT(note_id) DO UPDATE SET rating_count = rating_count + 1,
+                                                            rating_sum = rating_sum + NEW.rating;
+                     END''')
+        conn.execute('''CREATE TRIGGER trg_note_ratings_upd AFTER UPDATE OF rating ON note_ratings BEGIN
+                         UPDATE note_rating_stats SET rating_sum = rating_sum - OLD.rating + NEW.rating
+                         WHERE note_id = NEW.note_id;
+                     END''')
+        conn.execute('''CREATE TRIGGER trg_note_ratings_del AFTER DELETE ON note_ratings BEGIN
+                         UPDATE note_rating_stats SET rating_count = rating_count - 1, rating_sum = rating_sum - OLD.rating
+                         WHERE note_id = OLD.note_id;
+                     END''')
+    conn.commit()
+
+# ---------------- QUERIES ----------------
+# Statements sample4.py runs on every render, checked by
+# migrations.check_plans() against this schema.
+USER_SQL = "SELECT * FROM users WHERE username=?"
+POSTS_SQL = '''SELECT posts.content, posts.timestamp, users.username
+               FROM posts JOIN users ON posts.user_id = users.id
+               ORDER BY posts.id DESC'''
+COURSES_SQL = "SELECT username, title, description, timestamp FROM courses ORDER BY timestamp DESC"
+FORUM_SQL = "SELECT id, username, question, answer, timestamp FROM forum ORDER BY timestamp DESC"
+# Average rating comes from note_rating_stats, joined in the same query
+NOTES_SQL = '''SELECT n.id, n.username, n.title, n.file_path, n.timestamp,
+                     ROUND(1.0 * s.rating_sum / s.rating_count, 1)
+              FROM notes n LEFT JOIN note_rating_stats s ON s.note_id = n.id AND s.rating_count > 0
+              ORDER BY n.timestamp DESC'''
+# One statement against the unique (note_id, username) index, so two quick
+# submissions can't both insert
+RATE_NOTE_SQL = '''INSERT INTO note_ratings (note_id, username, rating) VALUES (?, ?, ?)
+                  ON CONFLICT(note_id, username) DO UPDATE SET rating=excluded.rating, timestamp=CURRENT_TIMESTAMP'''
+PODCASTS_SQL = "SELECT username, title, language, file_path, timestamp FROM podcasts ORDER BY timestamp DESC"
+PODCASTS_BY_LANGUAGE_SQL = ("SELECT username, title, language, file_path, timestamp FROM podcasts "
+                            "WHERE language=? ORDER BY timestamp DESC")
+
+HOT_QUERIES = {
+    "get_user": (USER_SQL, ("someone",)),
+    "get_all_posts": (POSTS_SQL, ()),
+    "get_courses": (COURSES_SQL, ()),
+    "get_forum": (FORUM_SQL, ()),
+    "get_notes": (NOTES_SQL, ()),
+    "rate_note": (RATE_NOTE_SQL, (1, "someone", 5)),
+    "get_podcasts": (PODCASTS_SQL, ()),
+    "get_podcasts[language]": (PODCASTS_BY_LANGUAGE_SQL, ("English",)),
+}
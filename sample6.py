@@ -2,6 +2,8 @@ import streamlit as st
 import sqlite3
 import os
 
+import passwords
+
 # ---------------- DATABASE ----------------
 conn = sqlite3.connect("student_connectivity.db", check_same_thread=False)
 c = conn.cursor()
@@ -59,15 +61,23 @@ conn.commit()
 def create_user(username, password, college):
     try:
         c.execute("INSERT INTO users (username, password, college, skills, bio, profile_pic) VALUES (?, ?, ?, ?, ?, ?)", 
-                  (username, password, college, "", "", ""))
+                  (username, passwords.hash_password(password), college, "", "", ""))
         conn.commit()
         return True
     except:
         return False
 
 def login_user(username, password):
-    c.execute("SELECT * FROM users WHERE username=? AND password=?", (username, password))
-    return c.fetchone()
+    # Shares its database with sample7.py; plaintext rows are rehashed on login
+    c.execute("SELECT * FROM users WHERE username=?", (username,))
+    user = c.fetchone()
+    ok, new_hash = passwords.login(username, password, user[2] if user else None, legacy="plain")
+    if not ok:
+        return None
+    if new_hash:
+        c.execute("UPDATE users SET password=? WHERE id=? AND password=?", (new_hash, user[0], user[2]))
+        conn.commit()
+    return user
 
 def get_user(username):
     c.execute("SELECT * FROM users WHERE username=?", (username,))
@@ -195,13 +205,17 @@ elif choice == "Login":
         username = st.text_input("Username")
         password = st.text_input("Password", type="password")
         if st.button("Login"):
-            result = login_user(username, password)
-            if result:
-                st.session_state.logged_in = True
-                st.session_state.username = username
-                st.success(f"Welcome {username}!")
+            try:
+                result = login_user(username, password)
+            except (passwords.TooManyAttempts, passwords.Busy) as e:
+                st.error(str(e).capitalize() + ".")
             else:
-                st.error("Invalid username or password")
+                if result:
+                    st.session_state.logged_in = True
+                    st.session_state.username = username
+                    st.success(f"Welcome {username}!")
+                else:
+                    st.error("Invalid username or password")
     else:
         username = st.session_state.username
         st.success(f"Welcome back {username}! ✅")
@@ -1,465 +1,515 @@
 import streamlit as st
-import sqlite3
+import mimetypes
 import os
 
+import assets
+import blobstore
+import cache
+import db
+import extract
+import images
+import jobs
+import media_server
+import metrics
+import migrations
+import passwords
+import search
+from uploads import UploadTooLarge
+from helpers import (
+    PAGE_SIZE, create_user, login_user, get_user, update_profile,
+    add_post, get_posts, add_course, get_courses,
+    add_notes, get_notes, get_note_meta, rate_note, get_liked_notes,
+    add_question, get_questions, answer_question, add_podcast, get_podcasts,
+    add_project, get_projects, join_project, get_project_members, get_my_projects,
+    add_hackathon, get_hackathons, join_hackathon, get_hackathon_participants, get_my_hackathons,
+    get_leaderboard, get_rank,
+)
+
+# Must be the first Streamlit command: cached resources below show a spinner
+st.set_page_config(page_title="SkillSync", layout="wide")
+
 # ---------------- DATABASE ----------------
-conn = sqlite3.connect("student_connectivity.db", check_same_thread=False)
-c = conn.cursor()
-
-# Users table
-c.execute('''CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE,
-                password TEXT,
-                college TEXT,
-                skills TEXT,
-                bio TEXT,
-                profile_pic TEXT
-            )''')
-
-# Other tables
-c.execute('''CREATE TABLE IF NOT EXISTS posts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT,
-                content TEXT
-            )''')
-
-c.execute('''CREATE TABLE IF NOT EXISTS courses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT,
-                course_name TEXT,
-                description TEXT
-            )''')
-
-c.execute('''CREATE TABLE IF NOT EXISTS notes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT,
-                title TEXT,
-                file_path TEXT,
-                rating INTEGER DEFAULT 0
-            )''')
-
-c.execute('''CREATE TABLE IF NOT EXISTS forum (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT,
-                question TEXT,
-                answer TEXT
-            )''')
-
-c.execute('''CREATE TABLE IF NOT EXISTS podcasts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT,
-                title TEXT,
-                file_path TEXT
-            )''')
-
-# New: Projects and Hackathons
-c.execute('''CREATE TABLE IF NOT EXISTS projects (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT,
-                description TEXT,
-                owner TEXT,
-                members TEXT
-            )''')
-
-c.execute('''CREATE TABLE IF NOT EXISTS hackathons (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT,
-                description TEXT,
-                start_date TEXT,
-                end_date TEXT,
-                participants TEXT
-            )''')
-
-conn.commit()
-
-# ---------------- HELPERS ----------------
-def create_user(username, password, college):
-    try:
-        c.execute("INSERT INTO users (username, password, college, skills, bio, profile_pic) VALUES (?, ?, ?, ?, ?, ?)", 
-                  (username, password, college, "", "", ""))
-        conn.commit()
-        return True
-    except:
-        return False
-
-def login_user(username, password):
-    c.execute("SELECT * FROM users WHERE username=? AND password=?", (username, password))
-    return c.fetchone()
-
-def get_user(username):
-    c.execute("SELECT * FROM users WHERE username=?", (username,))
-    return c.fetchone()
-
-def add_post(username, content):
-    c.execute("INSERT INTO posts (username, content) VALUES (?, ?)", (username, content))
-    conn.commit()
-
-def get_posts():
-    c.execute("SELECT * FROM posts ORDER BY id DESC")
-    return c.fetchall()
-
-def add_course(username, name, desc):
-    c.execute("INSERT INTO courses (username, course_name, description) VALUES (?, ?, ?)", (username, name, desc))
-    conn.commit()
-
-def get_courses():
-    c.execute("SELECT * FROM courses ORDER BY id DESC")
-    return c.fetchall()
-
-def add_notes(username, title, file_path):
-    c.execute("INSERT INTO notes (username, title, file_path) VALUES (?, ?, ?)", (username, title, file_path))
-    conn.commit()
-
-def get_notes():
-    c.execute("SELECT * FROM notes ORDER BY id DESC")
-    return c.fetchall()
-
-def rate_note(note_id, rating):
-    c.execute("UPDATE notes SET rating = rating + ? WHERE id=?", (rating, note_id))
-    conn.commit()
-
-def add_question(username, question):
-    c.execute("INSERT INTO forum (username, question, answer) VALUES (?, ?, ?)", (username, question, ""))
-    conn.commit()
-
-def get_questions():
-    c.execute("SELECT * FROM forum ORDER BY id DESC")
-    return c.fetchall()
-
-def answer_question(q_id, answer):
-    c.execute("UPDATE forum SET answer=? WHERE id=?", (answer, q_id))
-    conn.commit()
-
-def add_podcast(username, title, file_path):
-    c.execute("INSERT INTO podcasts (username, title, file_path) VALUES (?, ?, ?)", (username, title, file_path))
-    conn.commit()
-
-def get_podcasts():
-    c.execute("SELECT * FROM podcasts ORDER BY id DESC")
-    return c.fetchall()
-
-# ---------------- PROJECTS ----------------
-def add_project(owner, title, desc):
-    c.execute("INSERT INTO projects (title, description, owner, members) VALUES (?, ?, ?, ?)",
-              (title, desc, owner, owner))
-    conn.commit()
-
-def get_projects():
-    c.execute("SELECT * FROM projects ORDER BY id DESC")
-    return c.fetchall()
-
-def join_project(project_id, username):
-    c.execute("SELECT members FROM projects WHERE id=?", (project_id,))
-    members = c.fetchone()[0]
-    member_list = members.split(",") if members else []
-    if username not in member_list:
-        member_list.append(username)
-        c.execute("UPDATE projects SET members=? WHERE id=?", (",".join(member_list), project_id))
-        conn.commit()
-
-# ---------------- HACKATHONS ----------------
-def add_hackathon(title, desc, start_date, end_date):
-    c.execute("INSERT INTO hackathons (title, description, start_date, end_date, participants) VALUES (?, ?, ?, ?, ?)",
-              (title, desc, start_date, end_date, ""))
-    conn.commit()
-
-def get_hackathons():
-    c.execute("SELECT * FROM hackathons ORDER BY id DESC")
-    return c.fetchall()
-
-def join_hackathon(hackathon_id, username):
-    c.execute("SELECT participants FROM hackathons WHERE id=?", (hackathon_id,))
-    participants = c.fetchone()[0]
-    participant_list = participants.split(",") if participants else []
-    if username not in participant_list:
-        participant_list.append(username)
-        c.execute("UPDATE hackathons SET participants=? WHERE id=?", (",".join(participant_list), hackathon_id))
-        conn.commit()
-
-# ---------------- LEADERBOARD ----------------
-def get_leaderboard():
-    # Count posts
-    c.execute("SELECT username, COUNT(*) FROM posts GROUP BY username")
-    posts = dict(c.fetchall())
-
-    # Count notes + sum of ratings
-    c.execute("SELECT username, COUNT(*), SUM(rating) FROM notes GROUP BY username")
-    notes_data = c.fetchall()
-    notes = {u: (cnt, r if r else 0) for u, cnt, r in notes_data}
-
-    # Count courses
-    c.execute("SELECT username, COUNT(*) FROM courses GROUP BY username")
-    courses = dict(c.fetchall())
-
-    # Count answered forum questions
-    c.execute("SELECT username, COUNT(*) FROM forum WHERE answer != '' GROUP BY username")
-    answers = dict(c.fetchall())
-
-    # Count projects joined
-    c.execute("SELECT members FROM projects")
-    projects_members = c.fetchall()
-    project_points = {}
-    for row in projects_members:
-        for user in row[0].split(","):
-            project_points[user] = project_points.get(user, 0) + 3
-
-    # Count hackathons joined
-    c.execute("SELECT participants FROM hackathons")
-    hackathons_participants = c.fetchall()
-    hack_points = {}
-    for row in hackathons_participants:
-        for user in row[0].split(","):
-            hack_points[user] = hack_points.get(user, 0) + 5
-
-    # Aggregate scores
-    scores = {}
-    all_users = set(posts.keys()) | set(notes.keys()) | set(courses.keys()) | set(answers.keys()) | set(project_points.keys()) | set(hack_points.keys())
-    for u in all_users:
-        score = 0
-        score += posts.get(u, 0) * 2
-        score += notes.get(u, (0,0))[0] * 3
-        score += notes.get(u, (0,0))[1] * 1
-        score += courses.get(u,0) *2
-        score += answers.get(u,0) *4
-        score += project_points.get(u,0)
-        score += hack_points.get(u,0)
-        scores[u] = score
-
-    leaderboard = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-    return leaderboard
+@st.cache_resource
+def init_db():
+    # Schema changes run once per process, not on every rerun
+    migrations.migrate()
+
+init_db()
+
+@st.cache_resource
+def start_media_server():
+    # With SKILLSYNC_MEDIA_URL set, podcasts, pictures and static images are
+    # fetched by URL from here instead of through Streamlit
+    media_server.start()
+
+start_media_server()
+
+@st.cache_resource
+def start_jobs():
+    # Uploads hand their post-processing to the job workers and return at
+    # once; notes uploaded before the queue existed are queued here
+    jobs.start()
+    jobs.prune()
+    for note_id in extract.pending_notes():
+        jobs.enqueue("extract_note_text", dedupe_key=str(note_id), note_id=note_id)
+    for sha in images.missing_thumbnails():
+        jobs.enqueue("profile_thumbnails", dedupe_key=sha, sha=sha)
+
+start_jobs()
 
 # ---------------- SESSION STATE ----------------
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
     st.session_state.username = ""
 
-# ---------------- MAIN APP ----------------
-st.set_page_config(page_title="SkillSync", layout="wide")
-st.title("🎓 SkillSync")
-st.image("image.jpg", width=500)
-
-menu = ["Home", "Login", "SignUp"]
-choice = st.sidebar.selectbox("Menu", menu)
-
-# ---------------- HOME ----------------
-if choice == "Home":
-    st.subheader("The Student Powered Connectivity Platform")
-    st.write("Connect, share, and grow with students across campuses.")
-
-# ---------------- SIGNUP ----------------
-elif choice == "SignUp":
-    st.subheader("Create New Account")
-    new_user = st.text_input("Username")
-    new_pass = st.text_input("Password", type="password")
-    college = st.text_input("College Name")
-    if st.button("SignUp"):
-        if create_user(new_user, new_pass, college):
-            st.success("Account created successfully! Go to Login.")
-        else:
-            st.error("Username already exists.")
-
-# ---------------- LOGIN ----------------
-elif choice == "Login":
-    if not st.session_state.logged_in:
-        username = st.text_input("Username")
-        password = st.text_input("Password", type="password")
-        if st.button("Login"):
-            result = login_user(username, password)
-            if result:
-                st.session_state.logged_in = True
-                st.session_state.username = username
-                st.success(f"Welcome {username}!")
-            else:
-                st.error("Invalid username or password")
+# ---------------- FEED PAGING ----------------
+def load_page(key, fetch):
+    # One page per render; the cursor stack remembers where "Newer" goes back to
+    cursors = st.session_state.setdefault(f"{key}_cursors", [None])
+    rows = fetch(before_id=cursors[-1], limit=PAGE_SIZE + 1)
+    return rows[:PAGE_SIZE], len(rows) > PAGE_SIZE
+
+def pager(key, rows, has_more):
+    cursors = st.session_state[f"{key}_cursors"]
+    col1, col2 = st.columns(2)
+    if len(cursors) > 1:
+        col1.button("⬅️ Newer", key=f"{key}_newer", on_click=cursors.pop)
+    if has_more:
+        col2.button("Load more ➡️", key=f"{key}_more", on_click=cursors.append, args=(rows[-1][0],))
+
+# ---------------- DOWNLOADS ----------------
+def format_size(size):
+    if size is None:
+        return "size unknown"
+    for unit in ["B", "KB", "MB"]:
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+def download_on_demand(key, path, file_name, mime=None):
+    # Files are only read once the user asks for that one download
+    if not st.session_state.get(key):
+        st.button("Download", key=f"{key}_prepare", on_click=st.session_state.__setitem__, args=(key, True))
+    elif not os.path.exists(path):
+        st.warning("This file is no longer available.")
     else:
-        username = st.session_state.username
-        st.success(f"Welcome back {username}! ✅")
-
-        st.sidebar.subheader("Account")
-        if st.sidebar.button("Logout"):
-            st.session_state.logged_in = False
-            st.session_state.username = ""
-            st.success("You have been logged out. Please log in again.")
-            st.rerun()
-
-        section = st.sidebar.radio("Sections", ["Profile", "Posts", "Courses", "Notes", "Forum", "Podcasts", "Projects", "Hackathons", "Leaderboard"])
-
-        # ---------------- SECTIONS ----------------
-
-        # PROFILE
-        if section == "Profile":
-            user = get_user(username)
-            st.subheader("👤 Your Profile")
-            pic_path = f"profile_pics/{username}.png"
-            if os.path.exists(pic_path):
-                st.image(pic_path, width=120)
-            else:
-                st.info("No profile picture uploaded.")
-            st.write(f"**Username:** {user[1]}")
-            st.write(f"**College:** {user[3]}")
-            st.write("**Skills:**")
-            if user[4]:
-                for skill in user[4].split(","):
-                    st.markdown(f"- 🟢 {skill.strip()}")
+        metrics.add_file_bytes(os.path.getsize(path))
+        with open(path, "rb") as f:
+            st.download_button(f"📥 Save {file_name}", f, file_name=file_name, mime=mime,
+                               key=f"{key}_save", on_click=st.session_state.pop, args=(key, None))
+
+def avatar(user, width):
+    # The smallest thumbnail that covers `width`; the original until the
+    # thumbnail job has run
+    path = images.variant_for(user["profile_blob"], width)
+    if path:
+        return media_server.source(path)
+    if user["profile_pic"] and os.path.exists(user["profile_pic"]):
+        return media_server.source(user["profile_pic"], "profile" + images.sniff_extension(user["profile_pic"]))
+    return None
+
+def user_avatar(username, width):
+    return avatar(get_user(username), width)
+
+# ---------------- FRAGMENTS ----------------
+# Per-item widgets are fragments: liking a note, answering a question or
+# joining a project reruns only that item instead of the whole script.
+# Each is drawn from the data its section fetched for the page; what the
+# user changes is kept in session_state so the item can redraw itself
+# without querying again.
+def toggle_like(note_id, username, liked):
+    st.session_state[f"liked{note_id}"] = liked
+    rate_note(note_id, username, liked)
+
+@st.fragment
+def note_card(n, meta, was_liked, counted, username):
+    with metrics.fragment("Notes: like"):
+        pages = f" · {meta['page_count']} pages" if meta and meta["status"] == "done" else ""
+        st.write(f"**{n[2]}** by {n[1]} · {format_size(n[5])}{pages}")
+        if meta and meta["preview"]:
+            st.caption(meta["preview"])
+        liked = st.session_state.get(f"liked{n[0]}", was_liked)
+        st.write(f"⭐ {n[4] + liked - counted} likes")
+        download_on_demand(f"note{n[0]}", n["file_path"], n["file_name"] or os.path.basename(n["file_path"]))
+        if liked:
+            st.button("✅ Liked", key=f"like{n[0]}", on_click=toggle_like, args=(n[0], username, False))
+        else:
+            st.button("👍 Like", key=f"like{n[0]}", on_click=toggle_like, args=(n[0], username, True))
+
+@st.fragment
+def question_card(q):
+    with metrics.fragment("Forum: answer"):
+        st.write(f"**Q: {q[2]}** (by {q[1]})")
+        answer = q[3] or st.session_state.get(f"answered{q[0]}")
+        if answer:
+            st.write(f"👉 Answer: {answer}")
+            return
+        with st.form(f"answer{q[0]}"):
+            ans = st.text_input("Your Answer")
+            if st.form_submit_button("Submit Answer") and ans.strip():
+                answer_question(q[0], ans)
+                st.session_state[f"answered{q[0]}"] = ans
+                st.rerun(scope="fragment")
+
+@st.fragment
+def join_card(key, label, names, count, join, item_id, username):
+    with metrics.fragment(f"{label}: join"):
+        if st.session_state.get(key) and username not in names:
+            names, count = names + [username], count + 1
+        st.write(f"{label} ({count}): {', '.join(names) or 'None'}")
+        if username not in names and st.button("Join", key=f"{key}_btn"):
+            join(item_id, username)
+            st.session_state[key] = True
+            st.rerun(scope="fragment")
+
+# ---------------- MAIN APP ----------------
+# Per-rerun wall time, SQL statements, rows and file bytes (see metrics.py).
+# st.rerun(), st.stop() and errors end the script with an exception; the
+# rerun is still recorded, tagged as interrupted.
+metrics.begin_rerun()
+page = "Home"
+completed = False
+try:
+    st.title("🎓 SkillSync")
+    st.image(media_server.source(assets.asset_path("image.jpg", 500)), width=500)
+
+    menu = ["Home", "Login", "SignUp"]
+    choice = st.sidebar.selectbox("Menu", menu)
+    page = choice
+
+    # ---------------- HOME ----------------
+    if choice == "Home":
+        st.subheader("The Student Powered Connectivity Platform")
+        st.write("Connect, share, and grow with students across campuses.")
+
+    # ---------------- SIGNUP ----------------
+    elif choice == "SignUp":
+        st.subheader("Create New Account")
+        new_user = st.text_input("Username")
+        new_pass = st.text_input("Password", type="password")
+        college = st.text_input("College Name")
+        if st.button("SignUp"):
+            try:
+                created = create_user(new_user, new_pass, college)
+            except passwords.Busy as e:
+                st.error(str(e).capitalize() + ".")
             else:
-                st.write("No skills listed")
-            st.write(f"**Bio:** {user[5]}")
-            st.markdown("---")
-            st.subheader("✏️ Edit Profile")
-            new_college = st.text_input("Update College", value=user[3])
-            new_skills = st.text_input("Update Skills (comma separated)", value=user[4])
-            new_bio = st.text_area("Update Bio", value=user[5])
-            profile_pic = st.file_uploader("Upload Profile Picture", type=["png", "jpg", "jpeg"])
-            if st.button("Save Changes"):
-                c.execute("UPDATE users SET college=?, skills=?, bio=? WHERE username=?", 
-                          (new_college, new_skills, new_bio, username))
-                conn.commit()
-                if profile_pic:
-                    os.makedirs("profile_pics", exist_ok=True)
-                    with open(pic_path, "wb") as f:
-                        f.write(profile_pic.getbuffer())
-                st.success("✅ Profile updated! Please refresh to see changes.")
-
-        # POSTS
-        elif section == "Posts":
-            st.subheader("📝 Share a Post")
-            content = st.text_area("Write something...")
-            if st.button("Post"):
-                add_post(username, content)
-                st.success("Post added!")
-            st.subheader("📢 All Posts")
-            posts = get_posts()
-            for p in posts:
-                st.write(f"**{p[1]}:** {p[2]}")
-
-        # COURSES
-        elif section == "Courses":
-            st.subheader("📚 Share a Course")
-            name = st.text_input("Course Name")
-            desc = st.text_area("Course Description")
-            if st.button("Add Course"):
-                add_course(username, name, desc)
-                st.success("Course shared!")
-            st.subheader("🎓 Available Courses")
-            courses = get_courses()
-            for c_ in courses:
-                st.write(f"**{c_[2]}** by {c_[1]}")
-                st.write(c_[3])
-
-        # NOTES
-        elif section == "Notes":
-            st.subheader("📂 Upload Notes")
-            title = st.text_input("Title")
-            file = st.file_uploader("Upload File", type=["pdf", "docx", "txt"])
-            if st.button("Upload Notes"):
-                if file:
-                    os.makedirs("notes", exist_ok=True)
-                    path = f"notes/{file.name}"
-                    with open(path, "wb") as f:
-                        f.write(file.getbuffer())
-                    add_notes(username, title, path)
-                    st.success("Notes uploaded!")
-            st.subheader("📑 All Notes")
-            notes = get_notes()
-            for n in notes:
-                st.write(f"**{n[2]}** by {n[1]}")
-                st.write(f"⭐ {n[4]} likes")
-                with open(n[3], "rb") as f:
-                    st.download_button("Download", f, file_name=os.path.basename(n[3]))
-                if st.button("👍 Like", key=f"like{n[0]}"):
-                    rate_note(n[0], 1)
-                    st.success("You liked this note!")
-
-        # FORUM
-        elif section == "Forum":
-            st.subheader("❓ Ask a Question")
-            question = st.text_input("Your Question")
-            if st.button("Ask"):
-                add_question(username, question)
-                st.success("Question posted!")
-            st.subheader("💬 Forum Q&A")
-            qs = get_questions()
-            for q in qs:
-                st.write(f"**Q: {q[2]}** (by {q[1]})")
-                if q[3]:
-                    st.write(f"👉 Answer: {q[3]}")
+                if created:
+                    st.success("Account created successfully! Go to Login.")
                 else:
-                    ans = st.text_input("Your Answer", key=f"ans{q[0]}")
-                    if st.button("Submit Answer", key=f"btn{q[0]}"):
-                        answer_question(q[0], ans)
-                        st.success("Answer submitted!")
-
-        # PODCASTS
-        elif section == "Podcasts":
-            st.subheader("🎙️ Upload Podcast")
-            title = st.text_input("Title")
-            audio = st.file_uploader("Upload Audio", type=["mp3", "wav"])
-            if st.button("Upload"):
-                if audio:
-                    os.makedirs("podcasts", exist_ok=True)
-                    path = f"podcasts/{audio.name}"
-                    with open(path, "wb") as f:
-                        f.write(audio.getbuffer())
-                    add_podcast(username, title, path)
-                    st.success("Podcast uploaded!")
-            st.subheader("🎧 Available Podcasts")
-            podcasts = get_podcasts()
-            for p in podcasts:
-                st.write(f"**{p[2]}** by {p[1]}")
-                st.audio(p[3])
-
-        # PROJECTS
-        elif section == "Projects":
-            st.subheader("💡 Create a Project")
-            title = st.text_input("Project Title")
-            desc = st.text_area("Project Description")
-            if st.button("Create Project"):
-                add_project(username, title, desc)
-                st.success("Project created!")
-            st.subheader("🚀 Available Projects")
-            projects = get_projects()
-            for p in projects:
-                st.write(f"**{p[1]}** by {p[3]}")
-                st.write(p[2])
-                st.write(f"Members: {p[4]}")
-                if username not in p[4].split(","):
-                    if st.button(f"Join Project", key=f"join_proj{p[0]}"):
-                        join_project(p[0], username)
-                        st.success("You joined the project!")
-
-        # HACKATHONS
-        elif section == "Hackathons":
-            st.subheader("🏁 Create a Hackathon")
-            title = st.text_input("Hackathon Title")
-            desc = st.text_area("Description")
-            start = st.date_input("Start Date")
-            end = st.date_input("End Date")
-            if st.button("Create Hackathon"):
-                add_hackathon(title, desc, str(start), str(end))
-                st.success("Hackathon created!")
-            st.subheader("🎉 Upcoming Hackathons")
-            hackathons = get_hackathons()
-            for h in hackathons:
-                st.write(f"**{h[1]}** from {h[3]} to {h[4]}")
-                st.write(h[2])
-                st.write(f"Participants: {h[5] if h[5] else 'None'}")
-                if username not in (h[5] or "").split(","):
-                    if st.button(f"Join Hackathon", key=f"join_hack{h[0]}"):
-                        join_hackathon(h[0], username)
-                        st.success("You joined the hackathon!")
-
-        # LEADERBOARD
-        elif section == "Leaderboard":
-            st.subheader("🏆 Leaderboard")
-            leaderboard = get_leaderboard()
-            if not leaderboard:
-                st.info("No contributions yet. Start posting, sharing, and answering to climb the leaderboard!")
-            else:
-                for rank, (user, score) in enumerate(leaderboard, start=1):
-                    medal = "🥇" if rank==1 else "🥈" if rank==2 else "🥉" if rank==3 else "⭐"
-                    st.write(f"{medal} **{user}** — {score} points")
-                user_scores = dict(leaderboard)
-                if username in user_scores:
-                    user_rank = [u for u,_ in leaderboard].index(username)+1
-                    st.markdown(f"---\n### 👤 Your Rank: **#{user_rank}** with **{user_scores[username]} points**")
+                    st.error("Username already exists.")
+
+    # ---------------- LOGIN ----------------
+    elif choice == "Login":
+        if not st.session_state.logged_in:
+            username = st.text_input("Username")
+            password = st.text_input("Password", type="password")
+            if st.button("Login"):
+                try:
+                    result = login_user(username, password)
+                except (passwords.TooManyAttempts, passwords.Busy) as e:
+                    st.error(str(e).capitalize() + ".")
+                else:
+                    if result:
+                        st.session_state.logged_in = True
+                        st.session_state.username = username
+                        st.success(f"Welcome {username}!")
+                    else:
+                        st.error("Invalid username or password")
+        else:
+            username = st.session_state.username
+            st.success(f"Welcome back {username}! ✅")
+
+            st.sidebar.subheader("Account")
+            if st.sidebar.button("Logout"):
+                st.session_state.logged_in = False
+                st.session_state.username = ""
+                st.success("You have been logged out. Please log in again.")
+                st.rerun()
+
+            sections = ["Profile", "Posts", "Courses", "Notes", "Forum", "Podcasts", "Projects", "Hackathons", "Leaderboard"]
+            if get_user(username)["is_admin"]:
+                sections.append("Diagnostics")
+            section = st.sidebar.radio("Sections", sections)
+            page = section
+
+            # ---------------- SEARCH ----------------
+            query = st.sidebar.text_input("🔎 Search posts, courses, forum and notes (including their text)")
+            if query.strip():
+                if st.session_state.get("search_query") != query:
+                    st.session_state.search_query = query
+                    st.session_state.search_offset = 0
+                offset = st.session_state.search_offset
+                results = search.search(query, limit=search.PAGE_SIZE + 1, offset=offset)
+                st.subheader(f"🔎 Results for “{query}”")
+                if not results:
+                    st.info("Nothing matched. Try fewer or shorter words.")
+                for r in results[:search.PAGE_SIZE]:
+                    st.markdown(f"{search.SOURCES[r['kind']][1]} **{r['title']}** by {r['username']}")
+                    st.caption(r["snippet"])
+                col1, col2 = st.columns(2)
+                if offset:
+                    col1.button("⬅️ Previous", key="search_prev", on_click=st.session_state.__setitem__,
+                                args=("search_offset", max(offset - search.PAGE_SIZE, 0)))
+                if len(results) > search.PAGE_SIZE:
+                    col2.button("More results ➡️", key="search_more", on_click=st.session_state.__setitem__,
+                                args=("search_offset", offset + search.PAGE_SIZE))
+                st.markdown("---")
+
+            # ---------------- SECTIONS ----------------
+
+            # PROFILE
+            if section == "Profile":
+                # Independent reads and the picture's file stats run concurrently
+                # on the reader pool
+                user, my_projects, my_hackathons, pic = db.gather(
+                    (get_user, username), (get_my_projects, username), (get_my_hackathons, username),
+                    (user_avatar, username, 120))
+                st.subheader("👤 Your Profile")
+                if pic:
+                    st.image(pic, width=120)
+                else:
+                    st.info("No profile picture uploaded.")
+                st.write(f"**Username:** {user[1]}")
+                st.write(f"**College:** {user[3]}")
+                st.write("**Skills:**")
+                if user[4]:
+                    for skill in user[4].split(","):
+                        st.markdown(f"- 🟢 {skill.strip()}")
+                else:
+                    st.write("No skills listed")
+                st.write(f"**Bio:** {user[5]}")
+                st.write(f"**Projects:** {', '.join(t for _, t in my_projects) or 'None yet'}")
+                st.write(f"**Hackathons:** {', '.join(t for _, t in my_hackathons) or 'None yet'}")
+                st.markdown("---")
+                st.subheader("✏️ Edit Profile")
+                with st.form("edit_profile"):
+                    new_college = st.text_input("Update College", value=user[3])
+                    new_skills = st.text_input("Update Skills (comma separated)", value=user[4])
+                    new_bio = st.text_area("Update Bio", value=user[5])
+                    profile_pic = st.file_uploader("Upload Profile Picture", type=["png", "jpg", "jpeg"])
+                    submitted = st.form_submit_button("Save Changes")
+                if submitted:
+                    try:
+                        picture = blobstore.stage(profile_pic, "picture") if profile_pic else None
+                        # Profile, picture and its thumbnail job commit together
+                        with db.write():
+                            update_profile(username, new_college, new_skills, new_bio, picture)
+                            if picture:
+                                jobs.enqueue("profile_thumbnails", dedupe_key=picture[1], sha=picture[1])
+                        st.success("✅ Profile updated! Please refresh to see changes.")
+                    except UploadTooLarge as e:
+                        st.error(str(e))
+
+            # POSTS
+            elif section == "Posts":
+                st.subheader("📝 Share a Post")
+                with st.form("share_post", clear_on_submit=True):
+                    content = st.text_area("Write something...")
+                    submitted = st.form_submit_button("Post")
+                if submitted:
+                    add_post(username, content)
+                    st.success("Post added!")
+                st.subheader("📢 All Posts")
+                posts, has_more = load_page("posts", get_posts)
+                for p in posts:
+                    st.write(f"**{p[1]}:** {p[2]}")
+                pager("posts", posts, has_more)
+
+            # COURSES
+            elif section == "Courses":
+                st.subheader("📚 Share a Course")
+                with st.form("share_course", clear_on_submit=True):
+                    name = st.text_input("Course Name")
+                    desc = st.text_area("Course Description")
+                    submitted = st.form_submit_button("Add Course")
+                if submitted:
+                    add_course(username, name, desc)
+                    st.success("Course shared!")
+                st.subheader("🎓 Available Courses")
+                courses, has_more = load_page("courses", get_courses)
+                for c_ in courses:
+                    st.write(f"**{c_[2]}** by {c_[1]}")
+                    st.write(c_[3])
+                pager("courses", courses, has_more)
+
+            # NOTES
+            elif section == "Notes":
+                st.subheader("📂 Upload Notes")
+                with st.form("upload_notes", clear_on_submit=True):
+                    title = st.text_input("Title")
+                    file = st.file_uploader("Upload File", type=["pdf", "docx", "txt"])
+                    submitted = st.form_submit_button("Upload Notes")
+                if submitted:
+                    if file:
+                        try:
+                            staged = blobstore.stage(file, "note")
+                            with db.write():
+                                note_id = add_notes(username, title, staged, file.name)
+                                jobs.enqueue("extract_note_text", dedupe_key=str(note_id), note_id=note_id)
+                            st.success("Notes uploaded!")
+                        except UploadTooLarge as e:
+                            st.error(str(e))
+                st.subheader("📑 All Notes")
+                notes, has_more = load_page("notes", get_notes)
+                meta = get_note_meta([n[0] for n in notes])
+                liked, counted = get_liked_notes(username, [n[0] for n in notes])
+                for n in notes:
+                    note_card(n, meta.get(n[0]), n[0] in liked, n[0] in counted, username)
+                pager("notes", notes, has_more)
+
+            # FORUM
+            elif section == "Forum":
+                st.subheader("❓ Ask a Question")
+                with st.form("ask", clear_on_submit=True):
+                    question = st.text_input("Your Question")
+                    submitted = st.form_submit_button("Ask")
+                if submitted:
+                    add_question(username, question)
+                    st.success("Question posted!")
+                st.subheader("💬 Forum Q&A")
+                qs, has_more = load_page("forum", get_questions)
+                for q in qs:
+                    question_card(q)
+                pager("forum", qs, has_more)
+
+            # PODCASTS
+            elif section == "Podcasts":
+                st.subheader("🎙️ Upload Podcast")
+                with st.form("upload_podcast", clear_on_submit=True):
+                    title = st.text_input("Title")
+                    audio = st.file_uploader("Upload Audio", type=["mp3", "wav"])
+                    submitted = st.form_submit_button("Upload")
+                if submitted:
+                    if audio:
+                        try:
+                            staged = blobstore.stage(audio, "podcast")
+                            with db.write():
+                                podcast_id = add_podcast(username, title, staged, audio.name)
+                                jobs.enqueue("transcode_podcast", dedupe_key=str(podcast_id), podcast_id=podcast_id)
+                            st.success("Podcast uploaded!")
+                        except UploadTooLarge as e:
+                            st.error(str(e))
+                st.subheader("🎧 Available Podcasts")
+                podcasts, has_more = load_page("podcasts", get_podcasts)
+                for p in podcasts:
+                    st.write(f"**{p[2]}** by {p[1]}")
+                    st.audio(media_server.source(p["file_path"], p["file_name"]),
+                             format=mimetypes.guess_type(p["file_name"] or "")[0] or "audio/mpeg")
+                pager("podcasts", podcasts, has_more)
+
+            # PROJECTS
+            elif section == "Projects":
+                st.subheader("💡 Create a Project")
+                with st.form("create_project", clear_on_submit=True):
+                    title = st.text_input("Project Title")
+                    desc = st.text_area("Project Description")
+                    submitted = st.form_submit_button("Create Project")
+                if submitted:
+                    add_project(username, title, desc)
+                    st.success("Project created!")
+                st.subheader("🚀 Available Projects")
+                projects, has_more = load_page("projects", get_projects)
+                members = get_project_members([p[0] for p in projects])
+                for p in projects:
+                    st.write(f"**{p[1]}** by {p[3]}")
+                    st.write(p[2])
+                    join_card(f"join_proj{p[0]}", "Members", members[p[0]], p["member_count"], join_project, p[0], username)
+                pager("projects", projects, has_more)
+
+            # HACKATHONS
+            elif section == "Hackathons":
+                st.subheader("🏁 Create a Hackathon")
+                with st.form("create_hackathon", clear_on_submit=True):
+                    title = st.text_input("Hackathon Title")
+                    desc = st.text_area("Description")
+                    start = st.date_input("Start Date")
+                    end = st.date_input("End Date")
+                    submitted = st.form_submit_button("Create Hackathon")
+                if submitted:
+                    add_hackathon(title, desc, str(start), str(end))
+                    st.success("Hackathon created!")
+                st.subheader("🎉 Upcoming Hackathons")
+                hackathons, has_more = load_page("hackathons", get_hackathons)
+                participants = get_hackathon_participants([h[0] for h in hackathons])
+                for h in hackathons:
+                    st.write(f"**{h[1]}** from {h[3]} to {h[4]}")
+                    st.write(h[2])
+                    join_card(f"join_hack{h[0]}", "Participants", participants[h[0]], h["participant_count"],
+                              join_hackathon, h[0], username)
+                pager("hackathons", hackathons, has_more)
+
+            # LEADERBOARD
+            elif section == "Leaderboard":
+                st.subheader("🏆 Leaderboard")
+                leaderboard, my_rank = db.gather((get_leaderboard,), (get_rank, username))
+                if not leaderboard:
+                    st.info("No contributions yet. Start posting, sharing, and answering to climb the leaderboard!")
+                else:
+                    for rank, (user, score) in enumerate(leaderboard, start=1):
+                        medal = "🥇" if rank==1 else "🥈" if rank==2 else "🥉" if rank==3 else "⭐"
+                        st.write(f"{medal} **{user}** — {score} points")
+                    if my_rank:
+                        st.markdown(f"---\n### 👤 Your Rank: **#{my_rank[0]}** with **{my_rank[1]} points**")
+
+            # DIAGNOSTICS
+            elif section == "Diagnostics":
+                st.subheader("🩺 Diagnostics")
+                totals = metrics.totals()
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("SQL statements", f"{totals['statements']:,}")
+                col2.metric("Rows fetched", f"{totals['rows']:,}")
+                col3.metric("File bytes read", format_size(totals["file_bytes"]))
+                col4.metric("Slow queries", totals["slow_queries"])
+
+                st.markdown("#### Reruns by section")
+                by_section, interrupted = {}, {}
+                for r in metrics.recent_reruns():
+                    if r["interrupted"]:
+                        interrupted[r["label"]] = interrupted.get(r["label"], 0) + 1
+                    else:
+                        by_section.setdefault(r["label"], []).append(r)
+                summary = []
+                for label in sorted(by_section.keys() | interrupted.keys()):
+                    runs = by_section.get(label, [])
+                    times = sorted(r["seconds"] * 1000 for r in runs)
+                    row = {"section": label, "reruns": len(runs), "interrupted": interrupted.get(label, 0)}
+                    if runs:
+                        row.update({"p50 ms": round(times[len(times) // 2], 1),
+                                    "p95 ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 1),
+                                    "avg statements": round(sum(r["statements"] for r in runs) / len(runs), 1),
+                                    "avg rows": round(sum(r["rows"] for r in runs) / len(runs), 1)})
+                    summary.append(row)
+                st.dataframe(summary, use_container_width=True)
+                st.markdown("#### Latest reruns")
+                st.dataframe([{"at": r["at"], "section": r["label"], "ms": round(r["seconds"] * 1000, 1),
+                               "statements": r["statements"], "rows": r["rows"],
+                               "sql ms": round(r["sql_seconds"] * 1000, 1), "file bytes": r["file_bytes"],
+                               "interrupted": r["interrupted"]}
+                              for r in reversed(metrics.recent_reruns()[-50:])], use_container_width=True)
+
+                st.markdown(f"#### Slow queries (≥ {metrics.SLOW_QUERY_MS:.0f} ms)")
+                slow = metrics.slow_queries()
+                if not slow:
+                    st.info("No slow queries recorded.")
+                for q in reversed(slow):
+                    with st.expander(f"{q['at']} · {q['ms']:.0f} ms · {q['sql'][:80]}"):
+                        st.code(q["sql"], language="sql")
+                        st.caption(f"params: {q['params']}")
+                        if q["plan"]:
+                            st.code("\n".join(q["plan"]), language="text")
+
+                st.markdown("#### Cache and background jobs")
+                st.json({"cache": cache.stats(), "jobs": jobs.counts()})
+                if st.button("Check query plans"):
+                    scans = migrations.check_plans()
+                    if scans:
+                        st.warning(scans)
+                    else:
+                        st.success("Every hot query uses an index.")
+                st.download_button("📥 Prometheus metrics", metrics.prometheus(), file_name="metrics.prom",
+                                   mime="text/plain")
+    completed = True
+finally:
+    metrics.end_rerun(page, interrupted=not completed)
@@ -0,0 +1,48 @@
+import re
+
+import cache
+import db
+
+# ---------------- SOURCES ----------------
+# Each searchable table has an external-content FTS5 index kept in sync by
+# triggers (migrations 7 and 8). kind -> (fts table, label, joins that
+# bring in the owning row as t, title expression)
+SOURCES = {
+    "posts": ("posts_fts", "📝 Post", "JOIN posts t ON t.id = posts_fts.rowid", "t.content"),
+    "courses": ("courses_fts", "📚 Course", "JOIN courses t ON t.id = courses_fts.rowid", "t.course_name"),
+    "forum": ("forum_fts", "❓ Question", "JOIN forum t ON t.id = forum_fts.rowid", "t.question"),
+    "notes": ("notes_fts", "📑 Note", "JOIN notes t ON t.id = notes_fts.rowid", "t.title"),
+    "note_text": ("note_pages_fts", "📄 Inside a note",
+                  "JOIN note_pages np ON np.id = note_pages_fts.rowid JOIN notes t ON t.id = np.note_id",
+                  "t.title || ' · page ' || np.page"),
+}
+PAGE_SIZE = 20
+SNIPPET_TOKENS = 16
+
+def to_match(query):
+    # Plain words only, each as a quoted prefix term: "java"* "note"*
+    # Quoting keeps user input from being parsed as FTS5 syntax.
+    terms = re.findall(r"\w+", query)
+    return " ".join(f'"{t}"*' for t in terms)
+
+# ---------------- SEARCH ----------------
+@cache.cached("posts", "courses", "forum", "notes")
+def search(query, kinds=None, limit=PAGE_SIZE, offset=0):
+    # Ranked results across sources as rows of
+    # (kind, id, username, title, snippet, rank); lower rank is better
+    match = to_match(query)
+    if not match:
+        return []
+    parts, params = [], []
+    for kind in kinds or SOURCES:
+        fts, _, joins, title = SOURCES[kind]
+        # Each source is cut to the rows this page could need before merging
+        parts.append(f'''SELECT * FROM (
+                            SELECT '{kind}' AS kind, t.id, t.username, {title} AS title,
+                                   snippet({fts}, -1, '**', '**', '…', {SNIPPET_TOKENS}) AS snippet,
+                                   {fts}.rank AS rank
+                            FROM {fts} {joins}
+                            WHERE {fts} MATCH ? ORDER BY {fts}.rank LIMIT ?)''')
+        params += [match, offset + limit]
+    sql = " UNION ALL ".join(parts) + " ORDER BY rank LIMIT ? OFFSET ?"
+    return db.fetchall(sql, params + [limit, offset])
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+# The app modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache
+import db
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    # A fresh database file and an empty read cache; relative paths
+    # (blobs/, thumbs/) land in tmp_path too
+    monkeypatch.chdir(tmp_path)
+    db.close_all()
+    cache.clear()
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "test.db"))
+    yield
+    db.close_all()
@@ -0,0 +1,47 @@
+import io
+import os
+
+import blobstore
+import db
+import helpers
+import migrations
+
+def add_note(content):
+    return helpers.add_notes("a", "note", blobstore.stage(io.BytesIO(content)), "note.pdf")
+
+def refcount(sha):
+    row = db.fetchone("SELECT refcount FROM blobs WHERE sha256=?", (sha,))
+    return row and row[0]
+
+def test_identical_uploads_share_one_blob(temp_db):
+    migrations.migrate()
+    first, second = add_note(b"same bytes"), add_note(b"same bytes")
+    rows = db.fetchall("SELECT blob_sha, file_path FROM notes WHERE id IN (?, ?)", (first, second))
+    assert rows[0]["blob_sha"] == rows[1]["blob_sha"]
+    assert rows[0]["file_path"] == rows[1]["file_path"]
+    assert refcount(rows[0]["blob_sha"]) == 2
+    assert [name for _, _, files in os.walk(blobstore.BLOB_ROOT) for name in files] == [rows[0]["blob_sha"]]
+
+def test_gc_removes_only_unreferenced_blobs(temp_db):
+    migrations.migrate()
+    kept, dropped = add_note(b"kept"), add_note(b"dropped")
+    shas = dict(db.fetchall("SELECT id, blob_sha FROM notes"))
+    db.execute("DELETE FROM notes WHERE id=?", (dropped,))
+    assert refcount(shas[dropped]) == 0
+    assert blobstore.gc() == 1
+    assert refcount(shas[dropped]) is None
+    assert not os.path.exists(blobstore.blob_path(shas[dropped]))
+    assert refcount(shas[kept]) == 1
+    assert os.path.exists(blobstore.blob_path(shas[kept]))
+
+def test_gc_orphans_removes_unknown_files(temp_db):
+    migrations.migrate()
+    add_note(b"known")
+    orphan = blobstore.blob_path("ff" * 32)
+    os.makedirs(os.path.dirname(orphan))
+    with open(orphan, "wb") as f:
+        f.write(b"left by a crash")
+    assert blobstore.gc() == 0
+    assert blobstore.gc(orphans=True) == 1
+    assert not os.path.exists(orphan)
+    assert blobstore.stats()[0] == 1
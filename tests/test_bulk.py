@@ -0,0 +1,37 @@
+import csv
+import sqlite3
+
+import pytest
+
+import bulk
+import db
+import migrations
+
+def write_posts(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "username", "content"])
+        writer.writerows(rows)
+
+def test_failed_import_resumes_from_reported_offset(temp_db, tmp_path, capsys):
+    migrations.migrate()
+    path = str(tmp_path / "posts.csv")
+    # Row 5 repeats id 1; batches of 2 mean rows 1-4 are committed first
+    write_posts(path, [(i, "a", f"post {i}") for i in range(1, 5)] + [(1, "a", "dup"), (6, "a", "post 6")])
+    with pytest.raises(sqlite3.IntegrityError):
+        bulk.import_table("posts", path, batch_size=2)
+    assert "resume with --offset 4" in capsys.readouterr().err
+    assert db.fetchone("SELECT COUNT(*) FROM posts")[0] == 4
+
+    write_posts(path, [(i, "a", f"post {i}") for i in range(1, 5)] + [(5, "a", "post 5"), (6, "a", "post 6")])
+    assert bulk.import_table("posts", path, batch_size=2, offset=4) == (2, 2)
+    assert [row[0] for row in db.fetchall("SELECT id FROM posts ORDER BY id")] == [1, 2, 3, 4, 5, 6]
+
+def test_export_then_import_round_trips(temp_db, tmp_path):
+    migrations.migrate()
+    db.execute("INSERT INTO posts (username, content) VALUES ('a', 'hello, \"world\"')")
+    path = str(tmp_path / "posts.jsonl")
+    assert bulk.export_table("posts", path) == 1
+    assert bulk.import_table("posts", path, on_conflict="ignore") == (1, 0)
+    assert bulk.import_table("posts", path, on_conflict="replace") == (1, 1)
+    assert [tuple(row) for row in db.fetchall("SELECT username, content FROM posts")] == [("a", 'hello, "world"')]
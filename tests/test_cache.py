@@ -0,0 +1,65 @@
+import threading
+
+import cache
+
+def counting(*tags):
+    calls = []
+
+    @cache.cached(*tags)
+    def fetch(value):
+        calls.append(value)
+        return [value, len(calls)]
+
+    return fetch, calls
+
+def test_hit_until_tag_is_invalidated():
+    cache.clear()
+    fetch, calls = counting("test-items")
+    assert fetch(1) == fetch(1) == [1, 1]
+    assert fetch(2) == [2, 2]
+    cache.invalidate("test-other")
+    assert fetch(1) == [1, 1]
+    cache.invalidate("test-items")
+    assert fetch(1) == [1, 3]
+    assert calls == [1, 2, 1]
+
+def test_callable_tags_invalidate_one_key():
+    cache.clear()
+    fetch, calls = counting(lambda value: f"test-item:{value}")
+    fetch(1), fetch(2)
+    cache.invalidate("test-item:1")
+    fetch(1), fetch(2)
+    assert calls == [1, 2, 1]
+
+def test_value_read_during_invalidation_is_not_stored():
+    cache.clear()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    @cache.cached("test-race")
+    def fetch():
+        calls.append(1)
+        if len(calls) == 1:
+            started.set()
+            release.wait(5)
+        return len(calls)
+
+    reader = threading.Thread(target=fetch)
+    reader.start()
+    started.wait(5)
+    cache.invalidate("test-race")   # a write lands while the first read runs
+    release.set()
+    reader.join()
+    assert fetch() == 2
+    assert fetch() == 2
+
+def test_ttl_and_size_bounds(monkeypatch):
+    cache.clear()
+    monkeypatch.setattr(cache, "MAX_ENTRIES", 2)
+    fetch, calls = counting("test-bounded")
+    fetch(1), fetch(2), fetch(3)
+    fetch(1)   # evicted as the least recently used
+    assert calls == [1, 2, 3, 1]
+    monkeypatch.setattr(cache, "TTL_SECONDS", -1)
+    fetch(4), fetch(4)
+    assert calls == [1, 2, 3, 1, 4, 4]
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+
+import pytest
+
+import db
+import metrics
+import migrations
+
+def test_async_reads(temp_db):
+    migrations.migrate()
+    db.execute("INSERT INTO posts (username, content) VALUES ('a', 'hello')")
+
+    async def section():
+        one, rows = await asyncio.gather(db.afetchone("SELECT content FROM posts"),
+                                         db.afetchall("SELECT username FROM posts"))
+        return one[0], [row[0] for row in rows], await db.arun(lambda x, y=0: x + y, 1, y=2)
+
+    assert asyncio.run(section()) == ("hello", ["a"], 3)
+
+def test_gather_runs_calls_concurrently_in_order(temp_db):
+    migrations.migrate()
+    barrier = threading.Barrier(3, timeout=5)
+
+    def meet(value):
+        barrier.wait()   # only passes if all three run at the same time
+        return value
+
+    assert db.gather((meet, 1), (meet, 2), (meet, 3)) == [1, 2, 3]
+    assert asyncio.run(db.agather((meet, "a"), (meet, "b"), (meet, "c"))) == ["a", "b", "c"]
+
+def test_gather_reraises_and_counts_towards_rerun(temp_db):
+    migrations.migrate()
+
+    def boom():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        db.gather((db.fetchone, "SELECT 1"), (boom,))
+    with db.read(), db.read():
+        pass   # opens two readers up front (their PRAGMAs count as statements)
+    metrics.begin_rerun()
+    db.gather((db.fetchone, "SELECT 1"), (db.fetchone, "SELECT 2"))
+    assert metrics.end_rerun("test")["statements"] == 2
+
+def test_write_nests_as_savepoints(temp_db):
+    migrations.migrate()
+    with db.write() as conn:
+        conn.execute("INSERT INTO posts (username, content) VALUES ('a', 'kept')")
+        with pytest.raises(RuntimeError):
+            with db.write() as inner:
+                inner.execute("INSERT INTO posts (username, content) VALUES ('a', 'undone')")
+                raise RuntimeError
+    assert [row[0] for row in db.fetchall("SELECT content FROM posts")] == ["kept"]
@@ -0,0 +1,76 @@
+import time
+
+import db
+import jobs
+import migrations
+
+def test_retry_while_duplicate_queued(temp_db, monkeypatch):
+    migrations.migrate()
+    monkeypatch.setattr(jobs, "RETRY_BASE_SECONDS", 0)
+    calls = []
+
+    def flaky(key):
+        calls.append(key)
+        if len(calls) == 1:
+            # Someone queues the same work while this run is failing
+            jobs.enqueue("test_flaky", dedupe_key=key, key=key)
+            raise RuntimeError("first run fails")
+        return "ok"
+
+    monkeypatch.setitem(jobs.HANDLERS, "test_flaky", flaky)
+    first = jobs.enqueue("test_flaky", dedupe_key="k", key="k")
+    assert jobs.drain() == 2
+    rows = {row["id"]: row for row in db.fetchall("SELECT id, status, result FROM jobs")}
+    assert rows[first]["status"] == "done"
+    assert rows[first]["result"] == "superseded by a queued duplicate"
+    assert [row["status"] for row in rows.values()] == ["done", "done"]
+    assert calls == ["k", "k"]
+
+def test_lease_is_renewed_while_handler_runs(temp_db, monkeypatch):
+    migrations.migrate()
+    monkeypatch.setattr(jobs, "LEASE_SECONDS", 0.3)
+    seen = []
+
+    def slow():
+        time.sleep(0.6)
+        # Longer than one lease: another worker must still not get it
+        seen.append(jobs.claim("other"))
+
+    monkeypatch.setitem(jobs.HANDLERS, "test_slow", slow)
+    jobs.enqueue("test_slow")
+    assert jobs.drain() == 1
+    assert seen == [None]
+
+def test_enqueue_dedupes_waiting_jobs(temp_db):
+    migrations.migrate()
+    first = jobs.enqueue("test_noop", dedupe_key="k")
+    assert first is not None
+    assert jobs.enqueue("test_noop", dedupe_key="k") is None
+    assert jobs.enqueue("test_noop", dedupe_key="other") is not None
+    assert jobs.enqueue("test_noop") is not None
+    assert jobs.counts() == {"queued": 3}
+
+def test_failing_job_is_retried_then_failed(temp_db, monkeypatch):
+    migrations.migrate()
+    monkeypatch.setattr(jobs, "RETRY_BASE_SECONDS", 0)
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise RuntimeError("always fails")
+
+    monkeypatch.setitem(jobs.HANDLERS, "test_broken", broken)
+    job_id = jobs.enqueue("test_broken", max_attempts=3)
+    assert jobs.drain() == 3
+    row = db.fetchone("SELECT status, attempts, last_error FROM jobs WHERE id=?", (job_id,))
+    assert (row["status"], row["attempts"], len(calls)) == ("failed", 3, 3)
+    assert "always fails" in row["last_error"]
+
+def test_expired_lease_is_reclaimed(temp_db):
+    migrations.migrate()
+    job_id = jobs.enqueue("test_noop")
+    assert jobs.claim("crashed")["id"] == job_id
+    assert jobs.claim("other") is None
+    db.execute("UPDATE jobs SET locked_until=? WHERE id=?", (time.time() - 1, job_id))
+    job = jobs.claim("other")
+    assert (job["id"], job["attempts"]) == (job_id, 2)
@@ -0,0 +1,23 @@
+import pytest
+
+import metrics
+
+def test_interrupted_rerun_is_recorded_but_not_timed(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_FILE", "")
+    metrics.begin_rerun()
+    record = metrics.end_rerun("test: interrupted", interrupted=True)
+    assert record["interrupted"]
+    assert metrics.current_rerun() is None
+    assert metrics.recent_reruns()[-1] is record
+    text = metrics.prometheus()
+    assert 'skillsync_reruns_interrupted_total{section="test: interrupted"} 1' in text
+    assert 'skillsync_rerun_seconds_count{section="test: interrupted"}' not in text
+
+def test_fragment_tags_interrupted_runs(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_FILE", "")
+    with metrics.fragment("test: fragment"):
+        pass
+    with pytest.raises(RuntimeError):
+        with metrics.fragment("test: fragment"):
+            raise RuntimeError("st.rerun(scope='fragment')")
+    assert [r["interrupted"] for r in metrics.recent_reruns()[-2:]] == [False, True]
@@ -0,0 +1,35 @@
+import pytest
+
+import bulk
+import passwords
+
+@pytest.fixture
+def low_cost(monkeypatch):
+    monkeypatch.setattr(passwords, "ALGORITHM", "scrypt")
+    monkeypatch.setattr(passwords, "SCRYPT_N", 2**10)
+
+@pytest.mark.parametrize("stored", ["scrypt$hunter2", "scrypt$a$b$c$d$e", "scrypt$3$8$1$c2FsdA$ZGlnZXN0",
+                                    "pbkdf2_sha256$many$c2FsdA$ZGlnZXN0", "pbkdf2_sha256$"])
+def test_malformed_hash_is_a_legacy_plaintext_password(low_cost, stored):
+    assert not passwords.is_hashed(stored)
+    assert passwords.verify(stored, stored, "plain") == (True, True)
+    assert passwords.verify("wrong", stored, "plain") == (False, False)
+
+def test_rehash_when_cost_changes(low_cost, monkeypatch):
+    stored = passwords.hash_password("correct horse")
+    assert passwords.is_hashed(stored)
+    assert passwords.verify("correct horse", stored, "plain") == (True, False)
+    assert passwords.verify("wrong", stored, "plain") == (False, False)
+    monkeypatch.setattr(passwords, "SCRYPT_N", 2**11)
+    assert passwords.verify("correct horse", stored, "plain") == (True, True)
+
+def test_import_keeps_hashes_and_hashes_plaintext_at_the_import_cost(low_cost):
+    stored = passwords.hash_password("kept")
+    batch = [("a", stored), ("b", "plain"), ("c", "")]
+    progress = []
+    bulk.hash_passwords(batch, 1, cost=2**8, progress=lambda done, total: progress.append((done, total)))
+    assert batch[0] == ("a", stored)
+    assert batch[1][1].startswith("scrypt$256$")
+    assert passwords.verify("plain", batch[1][1], "plain") == (True, True)
+    assert batch[2] == ("c", "")
+    assert progress == [(1, 1)]
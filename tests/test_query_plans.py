@@ -0,0 +1,20 @@
+import migrations
+
+def test_migrations_apply_cleanly(temp_db):
+    applied = migrations.migrate()
+    assert [version for version, _ in applied] == [version for version, _, _ in migrations.MIGRATIONS]
+    assert migrations.migrate() == []
+
+def test_hot_queries_use_indexes(temp_db):
+    migrations.migrate()
+    assert migrations.check_plans() == {}
+
+def test_index_scans_count_as_full_scans():
+    assert migrations.is_full_scan("SCAN posts")
+    assert migrations.is_full_scan("SCAN posts USING COVERING INDEX idx_posts_username")
+    assert not migrations.is_full_scan("SEARCH posts USING INTEGER PRIMARY KEY (rowid<?)")
+    assert not migrations.is_full_scan("SCAN CONSTANT ROW")
+
+def test_allowed_full_scans_name_checked_queries():
+    names = set(migrations.hot_queries()) | {"sample4." + name for name in migrations.sample4_db.HOT_QUERIES}
+    assert set(migrations.FULL_SCANS_ALLOWED) <= names
@@ -0,0 +1,57 @@
+import sqlite3
+
+import pytest
+
+import cache
+import db
+import migrations
+import ratings
+
+@pytest.fixture
+def no_flusher(monkeypatch):
+    # Flushes happen only when the test calls flush()
+    monkeypatch.setattr(ratings, "_flusher", object())
+    monkeypatch.setattr(ratings, "_pending", {})
+
+def add_note():
+    return db.execute("INSERT INTO notes (username, title) VALUES ('owner', 'note')").lastrowid
+
+def test_flush_writes_final_state_of_each_click(temp_db, no_flusher):
+    migrations.migrate()
+    note = add_note()
+    ratings.record(note, "a")
+    ratings.record(note, "b")
+    ratings.record(note, "b", liked=False)
+    ratings.record(note, "c", liked=False)
+    assert ratings.pending("b") == {note: False}
+    assert ratings.flush() == 3
+    assert ratings.flush() == 0
+    assert [row[0] for row in db.fetchall("SELECT username FROM note_likes")] == ["a"]
+    assert db.fetchone("SELECT rating FROM notes WHERE id=?", (note,))[0] == 1
+    assert ratings.verify() == {}
+
+def test_flush_invalidates_cached_likes(temp_db, no_flusher):
+    migrations.migrate()
+    note = add_note()
+    calls = []
+
+    @cache.cached(lambda username: f"likes:{username}")
+    def likes(username):
+        calls.append(username)
+        return db.fetchone("SELECT COUNT(*) FROM note_likes WHERE username=?", (username,))[0]
+
+    assert likes("a") == 0
+    ratings.record(note, "a")
+    ratings.flush()
+    assert likes("a") == 1
+    assert calls == ["a", "a"]
+
+def test_failed_flush_keeps_the_batch(temp_db, no_flusher):
+    # No migrations: note_likes doesn't exist yet, so the write fails
+    ratings.record(1, "a")
+    with pytest.raises(sqlite3.OperationalError):
+        ratings.flush()
+    ratings.record(2, "a", liked=False)
+    assert ratings.pending("a") == {1: True, 2: False}
+    migrations.migrate()
+    assert ratings.flush() == 2
@@ -0,0 +1,22 @@
+import db
+import migrations
+import search
+
+def test_pages_are_ranked_and_disjoint(temp_db):
+    migrations.migrate()
+    for i in range(7):
+        db.execute("INSERT INTO posts (username, content) VALUES (?, ?)", ("a", f"python tip {i}"))
+        db.execute("INSERT INTO forum (username, question, answer) VALUES (?, ?, '')", ("b", f"python question {i}"))
+    pages = [search.search("pyth", limit=5, offset=offset) for offset in (0, 5, 10)]
+    assert [len(page) for page in pages] == [5, 5, 4]
+    results = [(row["kind"], row["id"]) for page in pages for row in page]
+    assert len(set(results)) == 14
+    ranks = [row["rank"] for page in pages for row in page]
+    assert ranks == sorted(ranks)
+
+def test_user_input_is_not_fts_syntax(temp_db):
+    migrations.migrate()
+    db.execute("INSERT INTO posts (username, content) VALUES ('a', 'NEAR the OR operator')")
+    assert search.to_match('"NEAR(a b)" OR -x*') == '"NEAR"* "a"* "b"* "OR"* "x"*'
+    assert [row["kind"] for row in search.search("near OR")] == ["posts"]
+    assert search.search("  *** ") == []
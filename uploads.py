@@ -0,0 +1,57 @@
+import hashlib
+import os
+import tempfile
+
+# ---------------- CONFIG ----------------
+# Uploads are copied in fixed-size chunks, hashed and size-checked as they
+# go, so no handler needs the whole file as one extra bytes object.
+CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = {
+    "note": 25 * 1024 * 1024,
+    "podcast": 100 * 1024 * 1024,
+    "picture": 5 * 1024 * 1024,
+}
+
+class UploadTooLarge(ValueError):
+    def __init__(self, kind, limit):
+        super().__init__(f"{kind} uploads are limited to {limit // (1024 * 1024)} MB")
+        self.kind = kind
+        self.limit = limit
+
+# ---------------- STREAMING ----------------
+def stream_to_temp(fileobj, kind, directory):
+    # Returns (temp_path, sha256, size); the temp file is removed again if
+    # the upload is too large or the copy fails. kind=None skips the limit
+    # (used when importing files that are already on disk).
+    limit = MAX_UPLOAD_BYTES[kind] if kind else None
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            fileobj.seek(0)
+            while True:
+                chunk = fileobj.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if limit is not None and size > limit:
+                    raise UploadTooLarge(kind, limit)
+                digest.update(chunk)
+                out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return tmp, digest.hexdigest(), size
+
+def save_upload(fileobj, kind, directory, name):
+    # For callers without the blob store: streams into directory and
+    # renames into place under a content-prefixed name, so two uploads
+    # with the same file name can't overwrite each other
+    tmp, sha, size = stream_to_temp(fileobj, kind, directory)
+    path = os.path.join(directory, f"{sha[:12]}_{os.path.basename(name)}")
+    os.replace(tmp, path)
+    return path